@@ -20,15 +20,37 @@ python PDIM.py -p 10 -d 3 -c 10 -t 0.001 -m classical -o n -s exp
 -d: number of dimensions. Integer number
 -c: number of cycles. Integer number
 -t: energy gradient tolerance. Float number
--m: minimization method (classical or mirrored). String
+-m: minimization method (classical, mirrored, global or symmetric). String
+-g: symmetry group of the symmetric method (antipodal, signs, cyclic,
+    permutations or hyperoctahedral). String
 -o: output points during minimization (y or n). String
--s: s increment (sum or exp). String
+-s: s increment (sum, exp or adaptive). String
+-k: number of nearest neighbours per point (0 = all points). Integer number
+-r: random seed of the initial points. Integer number
+-n: number of independent runs (multi-start). Integer number
+-j: number of parallel processes for multi-start. Integer number
+--checkpoint: write the minimization state to this file (.npz). String
+--every: write the checkpoint every N steps (default 1). Integer number
+--resume: continue the minimization saved in this checkpoint file. String
+--cache: directory of the point-set cache (warm start and storage). String
+--extend: add points (up to -p) to the points of this file (points.txt). String
+-q: quiet, print only the final results
+--log: write the progress as JSON lines to this file. String
+--profile: profile the minimization steps (cProfile) and write the statistics to this file. String
+
+Python usage (PDIM directory in the Python path):
+from PDIM import distribute, extend, cache
+points = distribute(10, 3, ncycles=10, tol=0.001, mtype='classical', sincr='exp')
+points = distribute(10, 3, cachedir=cache.CACHEDIR) #cached in $PDIM_CACHE
+points = extend(points, 14) #4 points added to a minimized set
 
 Printed variables:
 - Initial/Final Points: coordinates of the points
 - Mdist: minimal Euclidean distance of the system
 - Mangle: minimal angle of the system
 - Energy: energy of the system*
+- Covering radius: largest distance from a point of the sphere to the
+  set (Monte Carlo estimate, see metrics.py)
 
 *: compare the energies only from its correspondent cycle
 
@@ -43,146 +65,219 @@ Tricks:
 - If you are satisfied with the minimized codes (See Mdist and Mangle), you can
   stop the script by typing Ctrl+C to return the last minimized points
 - Sometimes the minimal energy is not reached probably due
-  a large number of points, unfortunately
+  a large number of points, unfortunately. Use -n to run several
+  independent minimizations (seeds -r, -r+1, ...) in parallel and keep
+  the one with the highest Mdist. A run is reproduced from its seed
+- Long minimizations can be resumed: with --checkpoint the full state
+  (points, s, cycle, step) is saved every --every steps, and
+  --resume continues it from the same cycle and step. Parameters not
+  given with --resume are taken from the checkpoint, and the resumed run
+  keeps saving its state to the same file (and --every) unless
+  --checkpoint (--every) is given
 - When using the mirrored minimization method, think about symmetry
+- The symmetric method (-m symmetric) generalises the mirrored one: only
+  the representatives of the orbits of a symmetry group (-g) are minimized
+  and the other points are their images. The number of points must be a
+  multiple of the order of the group
+- The global minimization method moves all points at once and is much
+  faster for a large number of points
+- For large s, only the nearest neighbours contribute to the energy.
+  With -k, energies and gradients are computed over the k nearest
+  neighbours of each point (rebuilt every step) instead of all points,
+  as soon as s is large enough for the farther points to be negligible
+- With -s adaptive, s grows faster when a cycle barely improves Mdist
+  (at most twice as large per cycle, up to 1024), and the minimization
+  stops once Mangle has not improved (0.01%) for two cycles, or when the
+  local minimizer fails at a large s (-c is then the maximum number of
+  cycles). Energies are computed and printed as ln(E), so a large s
+  never overflows, and
+  -t applies to the variation of ln(E)
+- More points can be added to a minimized set with --extend points.txt
+  and the new total -p. The new points are inserted at the largest gaps
+  and only them and their neighbours are minimized, so the given points
+  keep their order and stay close to where they were
+- Converged sets are reused with --cache: a set of the same points,
+  dimensions and method (or one of the points directory) is returned
+  without minimization, otherwise the run starts from the nearest one
+  (points added or removed, lower dimensions embedded) and its result
+  is stored. The least recently used sets are removed when the cache
+  exceeds its size (256 MB)
 
 Author: Antoniel A. S. Gomes (antonielaugusto@gmail.com)
 """
 
+import os
 import sys
+import json
 import time
 import getopt
+import pstats
+import cProfile
 import signal
-import itertools
+import collections
+import multiprocessing
 import numpy as np
 from scipy.optimize import minimize
 
-print(__doc__)
-start = time.time()
-
-#If no parameters are given
-if not sys.argv[1:]:
-    print('Input error:\nNo input parameters')
-    print('\nPlease, give at least one of the parameters below:')
-    print('\n-p: number of points. Integer number\n-d: number of dimensions. Integer number')
-    print('-c: number of cycles. Integer number\n-t: energy gradient tolerance. Float number')
-    print('-m: minimization method (classical or mirrored). String')
-    print('-o: print points every step (y = yes and n = no). String')
-    print('-s: increment s by 1 (sum) or a power of 2 (exp). String')
-    print('\nStandard usage: python PDIM.py -p 10 -d 3 -c 10 -t 0.001 -m classical -o n -s exp')
-    print('\nNot clear enough? Read the documentation above! :)')
-    sys.exit()
-
-#Read inputs
-variables, arguments = getopt.getopt(sys.argv[1:], 'p:d:c:t:m:o:s:', ['--npoints', '--ndimensions','--ncycles','--tolerance','--minimization','--output','--sincrement'])
-for var, arg in variables:
-    if var in ('-p', '--npoints'):
-        npoints = int(arg)
-    elif var in ('-d', '--ndimensions'):
-        ndim = int(arg)
-    elif var in ('-c', '--ncycles'):
-        ncycles = int(arg)
-    elif var in ('-t', '--tolerance'):
-        tol = float(arg)
-    elif var in ('-m', '--minimization'):
-        mtype = str(arg)
-    elif var in ('-o', '--output'):
-        outfiles = str(arg)
-    elif var in ('-s', '--sincrement'):
-        sincr = str(arg)
-
-#Try inputs. If not defined, set defaults
-try: npoints
-except NameError: npoints=None
-if npoints is None: npoints=int(10)
-if npoints < 1:
-    print('Input error:\nThe number of points (-p) must be a positive integer number greater than 1')
-    sys.exit()
-try: ndim
-except NameError: ndim=None
-if ndim is None: ndim=int(3)
-if ndim < 2:
-    print('Input error:\nThe number of dimensions (-d) must be a positive integer number greater than 1')
-    sys.exit()
-try: ncycles
-except NameError: ncycles=None
-if ncycles is None: ncycles=int(10)
-if ncycles < 1:
-    print('Input error:\nThe number of points (-p) must be a positive integer number greater than 0')
-    sys.exit()
-try: tol
-except NameError: tol=None
-if tol is None: tol=float(0.001)
-if tol < 0:
-    print('Input error:\nThe energy gradient tolerance (-t) must be a positive integer number')
-    sys.exit()
-try: mtype
-except NameError: mtype=None
-if mtype is None: mtype=str('classical')
-elif mtype not in ('classical', 'mirrored'):
-    print('Input error:\nUnrecognized parameter for -m: '+str(mtype))
-    print('Please select one of the two minimization methods (-m) available:')
-    print('\t1) classical: minimize each point in the system\n\t2) mirrored: minimize half of the points in the system, mirroring the other half')
-    sys.exit()
-try: outfiles
-except NameError: outfiles=None
-if outfiles is None: outfiles=str('n')
-elif outfiles not in ('y', 'n'):
-    print('Input error:\nUnrecognized parameter for -o: '+str(outfiles))
-    print('Please select one of the two output options:')
-    print('\t1) y: print points every minimization step\n\t2) n: do not print points every minimization step, only initial (start.txt) and final points (points.txt)')
-    sys.exit()
-try: sincr
-except NameError: sincr=None
-if sincr is None: sincr=str('exp')
-elif sincr not in ('sum', 'exp'):
-    print('Input error:\nUnrecognized parameter for -s: '+str(sincr))
-    print('Please select one of the two output options:')
-    print('\t1) sum: increment s by 1 after every minimization step (s = s + 1)\n\t2) exp: increment s by power of 2 after every minimization step (s = s^2)')
-    sys.exit()
-
-#Test if the number of points is odd
-if mtype == 'mirrored':
-    if (npoints % 2) != 0:
-        print('Input error:\nThe number of points (-p) is an odd number: '+str(npoints))
-        print('Tip: When using the mirrored minimization method, ask for an even number of points')
-        sys.exit()
+import pairwise
+import cache
+import symmetry
+import metrics
 
 ###Functions###
 
-#Mirror a vector
+#Minimizer calls, iterations (nit), evaluations of the objective and its
+#gradient (nfev, both are computed together) and accepted/rejected points
+#(classical and mirrored) of this process
+stats = collections.Counter()
+
+#cProfile.Profile enabled around every minimization step, if set (see --profile)
+profiler = None
+
+#Raised when the minimization cannot go on (overflow, NaN values...)
+class MinimizationError(RuntimeError):
+    pass
+
+#Check the parameters of a minimization. Raises ValueError
+def check(npoints, ndim, ncycles=10, tol=0.001, mtype='classical', sincr='exp', nneigh=0, group='antipodal'):
+    if npoints < 1:
+        raise ValueError('The number of points (-p) must be a positive integer number greater than 1')
+    if ndim < 2:
+        raise ValueError('The number of dimensions (-d) must be a positive integer number greater than 1')
+    if ncycles < 1:
+        raise ValueError('The number of cycles (-c) must be a positive integer number greater than 0')
+    if tol < 0:
+        raise ValueError('The energy gradient tolerance (-t) must be a positive number')
+    if mtype not in ('classical', 'mirrored', 'global', 'symmetric'):
+        raise ValueError('Unrecognized parameter for -m: '+str(mtype)+'\n'
+            'Please select one of the four minimization methods (-m) available:\n'
+            '\t1) classical: minimize each point in the system\n\t2) mirrored: minimize half of the points in the system, mirroring the other half\n'
+            '\t3) global: minimize all points of the system at once\n'
+            '\t4) symmetric: minimize the orbit representatives of a symmetry group (-g) at once')
+    if sincr not in ('sum', 'exp', 'adaptive'):
+        raise ValueError('Unrecognized parameter for -s: '+str(sincr)+'\n'
+            'Please select one of the three output options:\n'
+            '\t1) sum: increment s by 1 after every minimization step (s = s + 1)\n\t2) exp: increment s by power of 2 after every minimization step (s = s^2)\n'
+            '\t3) adaptive: increment s from the improvement of Mdist and stop when Mangle stops improving')
+    if nneigh < 0:
+        raise ValueError('The number of neighbours (-k) must be a positive integer number (0 = all points)')
+    #Test if the number of points is odd
+    if mtype == 'mirrored' and (npoints % 2) != 0:
+        raise ValueError('The number of points (-p) is an odd number: '+str(npoints)+'\n'
+            'Tip: When using the mirrored minimization method, ask for an even number of points')
+    if mtype == 'symmetric':
+        if group not in symmetry.GROUPS:
+            raise ValueError('Unrecognized parameter for -g: '+str(group)+'\n'
+                'Please select one of the symmetry groups (-g) available: '+', '.join(symmetry.GROUPS))
+        if npoints % symmetry.order(group, ndim) != 0:
+            raise ValueError('The number of points (-p) is not a multiple of the order of the '+str(group)+' group: '+str(symmetry.order(group, ndim))+'\n'
+                'Tip: When using the symmetric minimization method, ask for n times the order of the group')
+        if nneigh:
+            raise ValueError('The number of neighbours (-k) is not used by the symmetric minimization method. Please, remove it')
+
+#Mirror a vector (or a list of vectors). Zeros are kept as they are
 def mirror(v):
-    vneg=[]
-    for i in range(ndim):
-        if (v[i] == 0.0): vneg.append(v[i])
-        else: vneg.append(v[i]*-1.0)
-    return np.array(vneg)
+    v = np.asarray(v, dtype=float)
+    return np.where(v == 0.0, v, -v)
 
-#Minimal distance of a list of points
+#Initial value of s. Prevent s to be equal to zero
+def sinitial(ndim):
+    if ndim < 3:
+        return int(ndim - 1)
+    return int(ndim - 2)
+
+#Play with the increment of s
+def sincrement(s, sincr):
+    if sincr == 'sum':
+        return s + 1
+    elif sincr == 'exp':
+        return s * 2
+    return s
+
+#Largest s of the adaptive increment. Beyond it, only the nearest neighbours
+#contribute to the energy, and the local minimizer fails on its steep walls
+SMAX = 1024
+
+#Adaptive increment of s from the relative gain of Mdist in the last cycle
+#A cycle that barely moved the points was wasted at this s: jump further
+def sadaptive(s, gain):
+    if gain < 1e-3:
+        factor = 2.0
+    elif gain < 1e-2:
+        factor = 1.5
+    else:
+        factor = 1.25
+    return min(SMAX, max(s + 1, int(s * factor)))
+
+#A new random seed, so that a run can be reproduced
+def newseed():
+    return int(np.random.SeedSequence().entropy % 2**32)
+
+#Minimal distance of a list of points (cached, see metrics.py)
 def mdist(x):
-    di = []
-    for i,j in itertools.combinations(x, 2):
-        di.append(np.linalg.norm(np.array(i)-np.array(j)))
-    return np.min(di)
+    return metrics.mdist(x)
 
-#Minimal angle of a list of points
+#Minimal angle of a list of points (cached, see metrics.py)
 def mangle(x):
-    angles = []
-    for i,j in itertools.combinations(codes, 2):
-        angles.append(np.arccos(np.clip(np.dot(i, j), -1.0, 1.0)))
-    return np.degrees(np.min(angles))
+    return metrics.mangle(x)
+
+#Neighbour list of a list of points
+#Used only if the k-th neighbour contributes less than 1e-6 of the
+#nearest one to the energy of every point, otherwise all points are used
+def neighbourlist(x, s, nneigh=0):
+    if not nneigh: return None
+    near = pairwise.neighbours(x, nneigh)
+    if pairwise.truncation(x, near, s) > 1e-6: return None
+    return near
 
 #Energy of list of points (global energy)
-def ener(x):
-    di = []
-    for i,j in itertools.combinations(x, 2):
-        di.append(np.linalg.norm(np.array(i)-np.array(j)))
-    E = np.sum( ( initialdist / np.array(di) )**s )
-    return E
+#log: return ln(E), which never overflows
+def ener(x, initialdist, s, nneigh=0, log=False):
+    near = neighbourlist(x, s, nneigh)
+    if near is not None:
+        if log: return pairwise.pairs_logener(x, pairwise.neighbour_pairs(near), initialdist, s)
+        return pairwise.pairs_ener(x, pairwise.neighbour_pairs(near), initialdist, s)
+    if log: return pairwise.logener(x, initialdist, s)
+    return pairwise.ener(x, initialdist, s)
+
+#Generate the points randomly from a seed
+#When mirrored, the second half of the points mirrors the first one
+#When symmetric, the points are the images of random representatives
+def initial(npoints, ndim, mtype='classical', seed=None, group='antipodal'):
+    rng = np.random.default_rng(seed)
+    if mtype == 'mirrored': npoints = npoints // 2
+    if mtype == 'symmetric': npoints = npoints // symmetry.order(group, ndim)
+    codes = rng.standard_normal((npoints, ndim))
+    codes /= np.linalg.norm(codes, axis=1)[:, None]
+    if mtype == 'symmetric':
+        return symmetry.images(codes, symmetry.group(group, ndim))
+    #Add the mirrored points to codes
+    if mtype == 'mirrored':
+        codes = np.vstack([codes, mirror(codes)])
+    return codes
+
+#Insert new points in a set of points to reach npoints
+#The new points fill the largest gaps (see pairwise.farthest) and are added
+#after the others, which keep their order
+#Returns the points and the indices of the points to relax: the new ones
+#and the ones around them (closer than 1.5 times the gap they fill)
+def insert(codes, npoints, seed=None):
+    codes = np.asarray(codes, dtype=float)
+    codes = codes / np.linalg.norm(codes, axis=1)[:, None]
+    new, gaps = pairwise.farthest(codes, npoints - len(codes), np.random.default_rng(seed))
+    around = pairwise.around(codes, new, 1.5 * gaps)
+    return np.vstack([codes, new]), np.concatenate([around, np.arange(len(codes), npoints)])
+
+#Check that a set of points can be extended to npoints. Raises ValueError
+def checkextend(codes, npoints, mtype='classical'):
+    if mtype not in ('classical', 'global'):
+        raise ValueError('Points can only be added with the classical or global minimization methods (-m)')
+    if npoints <= len(codes):
+        raise ValueError('The number of points (-p) must be greater than the number of points to extend: '+str(len(codes)))
 
 #Elapsed time
-def elapsed(x):
-    end = x - start
+def elapsed(start):
+    end = time.time() - start
     if end < 60.0:
         print('\nElapsed time: '+str(round(end,2))+' seconds')
     elif (end > 60.0) and (end < 3600):
@@ -194,230 +289,634 @@ def elapsed(x):
         min = ((end / 3600.) - float(hours)) * 60
         print('\nElapsed time: '+str(round(hours,2))+' hours'+' and '+str(round(min,2))+' minutes')
 
-#If stopped, save the last minimized codes
-def keyboardInterruptHandler(signal, frame):
-    print('\n\tMinimization has stopped!\n')
-    print('Last Mdist:  '+str(mdist(codes)))
-    print('Last Mangle: '+str(mangle(codes)))
-    print('Last Energy: '+str(Ef))
-    print('\n\tLast Points:\n')
-    for i in codes:
-        print(' '.join(map(str, i)))
-    with open('points.txt', 'w') as f:
-        for item in codes:
-            f.write(str(' '.join(map(str, item)))+'\n')
-    elapsed(time.time())
-    sys.exit()
-
-signal.signal(signal.SIGINT, keyboardInterruptHandler)
+#Minimization function (one point at a time)
+#When mirrored, the second half of codes mirrors the first one
+#log: minimize ln(E) of every point instead of E
+#active: indices of the points to minimize (all by default), the others are fixed
+def minimization(codes, initialdist, s, mirrored=False, nneigh=0, log=False, active=None):
+    points = np.array(codes, dtype=float)
+    npoints = len(points) // 2 if mirrored else len(points)
+    ndim = points.shape[1]
+    point_ener = pairwise.point_logener if log else pairwise.point_ener
 
-#Minimization function
-def minimization(list):
-    #Backup of the last codes
-    bcodes = []
-    [bcodes.append(x) for x in list]
     #Objective function to minimize each point (local minimization)
-    #Classical
-    def objclassical(x):
-        di = []
-        for i in range(len(list)):
-            if i != curr:
-                d = np.linalg.norm(x-np.array(list[i]))
-                di.append(d)
-        try:
-            e = np.sum( ( initialdist / np.array(di) )**s )
-        except OverflowError as x:
-            print('\n\tFunction overflow!')
-            codes = []
-            [codes.append(x) for x in bcodes]
-            keyboardInterruptHandler(1.,1.)
-        return e
-    
-    #mirrored
-    def objmirrored(x):
-        di = []
-        tcodes = []
-        for i in range(npoints):
-            tcodes.append(list[i])
-        for i in range(npoints):
-            tcodes.append(mirror(list[i]))
-        for i in range(len(list)):
-            if i != curr:
-                d = np.linalg.norm(x-np.array(tcodes[i]))
-                di.append(d)
-        try:
-            e = np.sum( ( initialdist / np.array(di) )**s )
-        except OverflowError as x:
-            print('\n\t   Function overflow!')
-            codes = []
-            [codes.append(x) for x in bcodes]
-            keyboardInterruptHandler(1.,1.)
-        return e
-
-    #Jacobian Matrix to prevent erros
-    def jacobian(x):
-        x0 = np.asfarray(x)
-        f0 = np.atleast_2d(obj(*((x0,))))
-        jac = np.zeros([len(x0), len(f0)])
-        dx = np.zeros(len(x0))
-        for i in range(len(x0)):
-            dx[i] = np.sqrt(np.finfo(float).eps)
-            jac[i] = (obj(*((x0+dx,))) - f0)/(np.sqrt(np.finfo(float).eps))
-            dx[i] = 0.0
-        return jac.transpose()
-    
+    #Energy and analytic gradient of the point against all the others
+    #When mirrored, codes already holds the mirrored half, so the same objective is used
+    def obj(x, others):
+        e, g = point_ener(x, others, initialdist, s)
+        if not np.isfinite(e):
+            raise MinimizationError('Function overflow!')
+        return e, g
+
     #Constraints to obtain solutions with unit vectors only
     def unit(x):
         return np.linalg.norm(x) - 1.0
-    cons = {'type':'eq', 'fun': unit}
-    
+    def unitjac(x):
+        return x / np.linalg.norm(x)
+    cons = {'type':'eq', 'fun': unit, 'jac': unitjac}
+
     #Bounds to limit the solutions from -1 to 1
     bounds = []
     [bounds.append(tuple([-1.,1.])) for x in range(ndim)]
 
+    #Neighbour list of every point, rebuilt every minimization step
+    near = neighbourlist(points, s, nneigh)
+
     #Minimize each point
-    for i in range(npoints):
-        #Temporary codes. A necessary trick to update lists in Python
-        tcodes = []
-        [tcodes.append(x) for x in list]
-        #Energy of the temporary codes
-        Eti = ener(tcodes)
-        curr = i
-        #Define the objective function
-        if mtype == 'mirrored': obj=objmirrored
-        else: obj=objclassical
-        #Local minimization
-        sol = minimize(obj, np.array(list[i]), method='SLSQP', constraints=cons, jac=jacobian, args=(), bounds=tuple(bounds), options={'ftol': 1e-5, 'disp': False, 'maxiter': 10000})
+    for i in (range(npoints) if active is None else active):
+        #Points interacting with the current one
+        if near is not None: idx = near[i]
+        else: idx = np.delete(np.arange(len(points)), i)
+        others = points[idx]
+        #Local minimization (obj returns both the energy and its gradient)
+        sol = minimize(obj, points[i], method='SLSQP', constraints=cons, jac=True, args=(others,), bounds=tuple(bounds), options={'ftol': 1e-5, 'disp': False, 'maxiter': 10000})
+        stats.update(calls=1, nit=sol.nit, nfev=sol.nfev)
         #Preventing errors
         #If the function fails, stop minimization
         #Usually, this happens due to the function's exhaustiveness
         if (np.isnan(sol.x).any() ==  True):
-            print('\n\tNaN value found!')
-            keyboardInterruptHandler(1.,1.)
+            raise MinimizationError('NaN value found!')
         elif (np.around(np.linalg.norm(sol.x)) != 1.0):
-            print('\n\tPoint jumpped out the sphere!')
-            keyboardInterruptHandler(1.,1.)
-        #Update the solution to codes
-        tcodes[i] = sol.x
-        if mtype == 'mirrored': tcodes[i+npoints] = mirror(sol.x)
-        #Energy of the codes considering the new solution
-        Et = ener(tcodes)
+            raise MinimizationError('Point jumpped out the sphere!')
+        #Only the energy terms of the current point change with the new solution
+        #When mirrored, the terms of its mirror change by the same amount,
+        #except the pair with its own mirror, whose distance is always 2
+        #The terms are those against all points, even with a neighbour list:
+        #the new position may be close to a point that is not a neighbour
+        others = points[np.delete(np.arange(len(points)), [i, i+npoints] if mirrored else i)]
+        Eti = point_ener(points[i], others, initialdist, s)[0]
+        Et = point_ener(sol.x, others, initialdist, s)[0]
         #Global minimization: accept the new codes only if the energy is decreased
         if (Et < Eti):
-            list[i] = sol.x
-            if mtype == 'mirrored': list[i+npoints] = mirror(sol.x)
-    return list
-
-###Initiation###
-
-#If mirrored is selected, process only half of the points
-if mtype == 'mirrored':
-    npoints = int(npoints/2)
-
-#Prevent s to be equal to zero
-if ndim < 3:
-    s=int(ndim - 1)
-else:
-    s=int(ndim - 2)
-
-#Generate the points randomly
-codes = []
-for i in range(npoints):
-    vec = np.random.randn(1,ndim)
-    vec /= np.linalg.norm(vec,axis=1)
-    codes.append(vec[0])
-
-#Add the mirrored points to codes
-if mtype == 'mirrored':
-    for i in range(npoints):
-        codes.append(mirror(codes[i]))
-
-#Print parameters
-print('\t# Start #')
-print('\n\tInitial parameters:\n')
-print('Number of points:          '+str(len(codes)))
-print('Number of dimensions:      '+str(ndim))
-print('Number of cycles:          '+str(ncycles))
-print('Energy gradient tolerance: '+str(tol))
-print('Minimization method:       '+str(mtype))
-print('Output:                    '+str(outfiles))
-print('s increment:               '+str(sincr))
-print('\n\tInitial Points:\n')
-
-#Print the initial codes
-for i in codes:
-    print(' '.join(map(str, i)))
-
-initialdist = mdist(codes)
-print('\nMdist:  '+str(mdist(codes)))
-print('Mangle: '+str(mangle(codes)))
-print('Energy: '+str(ener(codes)))
-
-#Write the initial codes to a file
-with open('start.txt', 'w') as f:
-    for item in codes:
-        f.write(str(' '.join(map(str, item)))+'\n')
-
-#Initial input variables
-Ef = ener(codes) #Energy of the initial codes
-
-step = 0 #Step number
-
-#Minimization cycle
-for cycle in range(ncycles):
-    print('\n\tCycle '+str(cycle+1)+' (s = '+str(s)+')')
-    dE = np.inf #Initial energy to infinty
-    initialdist = mdist(codes) #Initial mdist
-    #Minimize until reaching the desired gradient
-    while (dE > tol):
-        step = step + 1
-        Ei = ener(codes)
-        #Temporary codes. A necessary trick to update lists in Python
-        tcodes = []
-        [tcodes.append(x) for x in codes]
-        #Minimize the codes
-        mcodes = minimization(tcodes)
-        #Energy of the minimized codes
-        Ef = ener(mcodes)
-        #Energy variation after minimization
-        dE = abs(Ef - Ei)
-        #Print parameters
-        print('\n\tStep '+str(step))
-        print('Mdist:  '+str(mdist(mcodes)))
-        print('Mangle: '+str(mangle(mcodes)))
-        print('Energy: '+str(Ef))
-        #Update codes
-        codes = []
-        [codes.append(x) for x in mcodes]
-        #Write the new codes to a file
-        if outfiles == 'y':
-                with open('step_%s.txt' % step, 'w') as f:
-                    for item in codes:
-                        f.write(str(' '.join(map(str, item)))+'\n')
-    #Play with the increment of s
-    if sincr == 'sum':
-        s = s + 1
-    elif sincr == 'exp':
-        s = s * 2
-
-###Termination###
-
-#Print variables
-print('\n\t# Termination #\n')
-print('Final Mdist:  '+str(mdist(codes)))
-print('Final Mangle: '+str(mangle(codes)))
-print('Final Energy: '+str(Ef))
-print('\n\tFinal Points:\n')
-
-#Print the final codes
-for i in codes:
-    print(' '.join(map(str, i)))
+            points[i] = sol.x
+            if mirrored: points[i+npoints] = mirror(sol.x)
+            stats.update(accepted=1)
+        else:
+            stats.update(rejected=1)
+    return points
+
+#Global minimization function
+#All points are minimized at once on the product of unit spheres.
+#L-BFGS runs over unconstrained vectors y and the points are x = y/|y|,
+#so no constraint solver is needed: the points are renormalised instead
+#log: minimize ln(E) instead of E
+#group: matrices of a symmetry group (see symmetry.py). codes are then the
+#representatives and the energy is the one of all their images
+#active: indices of the points to minimize (all by default), the others are fixed
+def globalminimization(codes, initialdist, s, nneigh=0, log=False, group=None, active=None):
+    points = np.array(codes, dtype=float)
+    if active is None: active = slice(None)
+    shape = points[active].shape
+    #Pairs of neighbours, rebuilt every minimization step
+    near = neighbourlist(points, s, nneigh) if group is None else None
+    if near is not None: pairs = pairwise.neighbour_pairs(near)
+    #Objective function: global energy and its gradient with respect to y
+    def obj(y):
+        y = y.reshape(shape)
+        norm = np.linalg.norm(y, axis=1)[:, None]
+        x = points.copy()
+        x[active] = y / norm
+        with np.errstate(over='ignore', invalid='ignore'):
+            if group is not None: e, g = symmetry.ener_grad(x, group, initialdist, s, log)
+            elif near is not None:
+                if log: e, g = pairwise.pairs_logener_grad(x, pairs, initialdist, s)
+                else: e, g = pairwise.pairs_ener_grad(x, pairs, initialdist, s)
+            elif log: e, g = pairwise.logener_grad(x, initialdist, s)
+            else: e, g = pairwise.ener_grad(x, initialdist, s)
+        x, g = x[active], g[active]
+        #Overflow in a trial step: reject it so the line search backtracks
+        if not np.isfinite(e) or not np.isfinite(g).all():
+            return np.inf, np.zeros(y.size)
+        #Chain rule of the normalisation: remove the radial component
+        g = (g - np.sum(g * x, axis=1)[:, None] * x) / norm
+        return e, g.ravel()
+
+    sol = minimize(obj, np.ravel(points[active]), method='L-BFGS-B', jac=True, options={'maxiter': 10000})
+    stats.update(calls=1, nit=sol.nit, nfev=sol.nfev)
+    if (np.isnan(sol.x).any() ==  True):
+        raise MinimizationError('NaN value found!')
+    x = sol.x.reshape(shape)
+    points[active] = x / np.linalg.norm(x, axis=1)[:, None]
+    return points
+
+#Save the full minimization state to a binary checkpoint (.npz)
+#The file is replaced at once, so a preempted run never leaves it half written
+def save(filename, codes, s, cycle, step, dE, initialdist, E, **params):
+    tmp = filename + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, codes=np.asarray(codes), s=s, cycle=cycle, step=step, dE=dE, initialdist=initialdist, Ef=E, npoints=len(codes), ndim=np.shape(codes)[1], **params)
+    os.replace(tmp, filename)
+
+#Read a checkpoint written by save
+def load(filename):
+    return dict(np.load(filename))
+
+#Minimization cycles of a set of points
+#Returns the minimized points, their energy and the number of steps
+#callback(event, info) is called at the start of every cycle ('cycle')
+#and after every minimization step ('step', with the duration of the step
+#and the minimizer counts of stats)
+#checkpoint: file where the state is saved every `every` steps
+#state: a checkpoint to continue from (see load)
+#With sincr='adaptive', energies are computed as ln(E), s is increased from
+#the gain of Mdist (see sadaptive) and the cycles stop early once Mangle has
+#not improved by 0.01% for two cycles, or when the minimizer fails once s has
+#grown (callback event 'stop')
+#With mtype='symmetric', codes are the images of initial(..., group=group)
+#active: indices of the points to minimize (classical and global), the others are fixed
+def run(codes, ncycles=10, tol=0.001, mtype='classical', sincr='exp', nneigh=0, seed=None, callback=None, checkpoint=None, every=1, state=None, group='antipodal', active=None):
+    codes = np.array(codes, dtype=float)
+    log = sincr == 'adaptive'
+    s = sinitial(codes.shape[1])
+    initialdist = mdist(codes)
+
+    #Symmetric codes: the first nreps points are the representatives
+    if mtype == 'symmetric':
+        matrices = symmetry.group(group, codes.shape[1])
+        nreps = len(codes) // len(matrices)
+
+    #Energy of the codes, from their representatives when symmetric
+    def energy(codes):
+        if mtype == 'symmetric': return symmetry.ener(codes[:nreps], matrices, initialdist, s, log)
+        return ener(codes, initialdist, s, nneigh, log)
+
+    Ef = energy(codes) #Energy of the initial codes
+
+    step = 0 #Step number
+    first = 0 #First cycle
+    best = mangle(codes) #Best Mangle at the end of a cycle (adaptive)
+    stall = 0 #Cycles without improvement of Mangle (adaptive)
+    converged = False #The local minimizer failed at a large s (adaptive)
+
+    #Continue from the cycle and step of the checkpoint
+    if state is not None:
+        s = state['s'].item()
+        Ef = state['Ef'].item()
+        step = int(state['step'])
+        first = int(state['cycle'])
+        if 'mangle' in state:
+            best, stall = state['mangle'].item(), int(state['stall'])
+        if 'active' in state: active = state['active']
+
+    #Minimization cycle
+    for cycle in range(first, ncycles):
+        if callback: callback('cycle', {'cycle': cycle, 's': s})
+        dE = np.inf #Initial energy to infinty
+        initialdist = mdist(codes) #Initial mdist
+        #A resumed cycle keeps its energy variation and initial mdist
+        if state is not None and cycle == first:
+            dE = state['dE'].item()
+            initialdist = state['initialdist'].item()
+        #Minimize until reaching the desired gradient
+        while (dE > tol):
+            step = step + 1
+            Ei = energy(codes)
+            t0, before = time.time(), stats.copy()
+            #Minimize the codes
+            if profiler is not None: profiler.enable()
+            try:
+                if mtype == 'global': codes = globalminimization(codes, initialdist, s, nneigh, log, active=active)
+                elif mtype == 'symmetric': codes = symmetry.images(globalminimization(codes[:nreps], initialdist, s, log=log, group=matrices), matrices)
+                else: codes = minimization(codes, initialdist, s, mtype == 'mirrored', nneigh, log, active)
+            except MinimizationError:
+                #Adaptive: once s has grown, a failure comes from the steep energy
+                #of a converged set. The points of the last step are kept
+                if sincr != 'adaptive' or s == sinitial(codes.shape[1]): raise
+                converged = True
+                break
+            finally:
+                if profiler is not None: profiler.disable()
+            #Energy of the minimized codes
+            Ef = energy(codes)
+            #Energy variation after minimization
+            dE = abs(Ef - Ei)
+            #Minimizer counts of the step (see stats)
+            counts = {name: stats[name] - before[name] for name in ('calls', 'nit', 'nfev', 'accepted', 'rejected')}
+            if callback: callback('step', dict({'cycle': cycle, 'step': step, 's': s, 'codes': codes, 'energy': Ef, 'dE': dE, 'duration': time.time() - t0}, **counts))
+            #Save the state every `every` steps and at the end of each cycle
+            if checkpoint is not None and (step % every == 0 or dE <= tol):
+                save(checkpoint, codes, s, cycle, step, dE, initialdist, Ef,
+                     ncycles=ncycles, tol=tol, mtype=mtype, sincr=sincr, nneigh=nneigh, seed=-1 if seed is None else seed, group=group, mangle=best, stall=stall, every=every,
+                     **({} if active is None else {'active': active}))
+        if sincr != 'adaptive':
+            s = sincrement(s, sincr)
+            continue
+        if converged:
+            if callback: callback('stop', {'cycle': cycle, 's': s, 'mangle': max(best, mangle(codes)), 'failed': True})
+            break
+        #Stop when Mangle stops improving
+        angle = mangle(codes)
+        stall = stall + 1 if angle - best < 1e-4 * best else 0
+        best = max(best, angle)
+        if stall >= 2:
+            if callback: callback('stop', {'cycle': cycle, 's': s, 'mangle': best})
+            break
+        s = sadaptive(s, (mdist(codes) - initialdist) / initialdist)
+    return codes, Ef, step
+
+#Write the points of a list to a file
+def writepoints(filename, codes):
+    with open(filename, 'w') as f:
+        for item in codes:
+            f.write(str(' '.join(map(str, item)))+'\n')
 
-#Save the final codes
-with open('points.txt', 'w') as f:
-    for item in codes:
-        f.write(str(' '.join(map(str, item)))+'\n')
+#Write the points of a minimization step to prefix + step_N.txt
+#Used as run callback (see -o y)
+def stepfile(prefix, event, info):
+    if event == 'step':
+        writepoints(prefix+'step_%s.txt' % info['step'], info['codes'])
+
+#One of the independent runs of a multi-start (run in a worker process)
+def startrun(args):
+    seed, npoints, ndim, options = args
+    options = dict(options)
+    t0 = time.time()
+    #Files of a run are prefixed with its seed
+    prefix = 'seed_%s_' % seed
+    if options.pop('outfiles', False):
+        options['callback'] = lambda event, info: stepfile(prefix, event, info)
+    if options.get('checkpoint'):
+        folder, name = os.path.split(options['checkpoint'])
+        options['checkpoint'] = os.path.join(folder, prefix+name)
+    #Minimizer counts of this run only
+    stats.clear()
+    codes, E, nsteps = run(initial(npoints, ndim, options.get('mtype', 'classical'), seed, options.get('group', 'antipodal')), seed=seed, **options)
+    return dict({'seed': seed, 'points': codes, 'mdist': mdist(codes), 'mangle': mangle(codes),
+                 'energy': E, 'steps': nsteps, 'duration': time.time() - t0}, **stats)
+
+#Only the main process handles Ctrl+C during a multi-start
+def worker():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+#Independent runs of several seeds in a pool of processes
+#Yields the result (dict) of every run as soon as it finishes
+#options are passed to run (outfiles=True writes the step files)
+def multistart(npoints, ndim, seeds, nprocs=None, **options):
+    seeds = list(seeds)
+    if nprocs is None: nprocs = min(len(seeds), multiprocessing.cpu_count())
+    with multiprocessing.Pool(nprocs, initializer=worker) as pool:
+        for result in pool.imap_unordered(startrun, [(seed, npoints, ndim, options) for seed in seeds]):
+            yield result
+
+#Name of the cached sets of a minimization method
+def cachekey(mtype, group='antipodal'):
+    if mtype == 'symmetric': return mtype+'_'+group
+    return mtype
+
+#Distribute N points on the surface of a D-dimensions unit sphere
+#Returns the points as an (N, D) array. No files are written
+#nstarts > 1 performs independent runs from seeds seed, seed+1, ...
+#in nprocs processes and returns the one with the highest Mdist (then Mangle)
+#cachedir: directory of the point-set cache (see cache.py). A cached set is
+#returned at once, otherwise a single run starts from the nearest cached set
+#and its result is stored in the cache
+#group: symmetry group of the symmetric method (see symmetry.py)
+def distribute(npoints, ndim, ncycles=10, tol=0.001, mtype='classical', sincr='exp', nneigh=0, seed=None, nstarts=1, nprocs=None, cachedir=None, group='antipodal'):
+    check(npoints, ndim, ncycles, tol, mtype, sincr, nneigh, group)
+    key = cachekey(mtype, group)
+    if cachedir is not None:
+        codes = cache.lookup(npoints, ndim, key, cachedir)
+        if codes is not None: return codes
+    options = {'ncycles': ncycles, 'tol': tol, 'mtype': mtype, 'sincr': sincr, 'nneigh': nneigh, 'group': group}
+    if nstarts == 1:
+        codes = None
+        if cachedir is not None: codes = cache.warmstart(npoints, ndim, key, cachedir, seed)[0]
+        if codes is None: codes = initial(npoints, ndim, mtype, seed, group)
+        codes = run(codes, seed=seed, **options)[0]
+    else:
+        if seed is None: seed = newseed()
+        results = multistart(npoints, ndim, range(seed, seed + nstarts), nprocs, **options)
+        codes = max(results, key=lambda r: (r['mdist'], r['mangle']))['points']
+    if cachedir is not None: cache.store(codes, key, cachedir)
+    return codes
+
+#Extend a set of minimized points to npoints
+#Only the new points and the points around them are minimized (see insert),
+#so the other points stay where they were
+#Returns the points as an (npoints, D) array, the given points first
+def extend(codes, npoints, ncycles=10, tol=0.001, mtype='classical', sincr='exp', nneigh=0, seed=None):
+    codes = np.asarray(codes, dtype=float)
+    check(npoints, codes.shape[1], ncycles, tol, mtype, sincr, nneigh)
+    checkextend(codes, npoints, mtype)
+    codes, active = insert(codes, npoints, seed)
+    return run(codes, ncycles, tol, mtype, sincr, nneigh, seed, active=active)[0]
+
+###Command line###
+
+#Write an event to a JSON-lines log (the points are not written)
+def logevent(log, event, start, **fields):
+    if log is None: return
+    record = {'event': event, 'time': round(time.time() - start, 6)}
+    for name, value in fields.items():
+        if name in ('codes', 'points'): continue
+        record[name] = value.item() if isinstance(value, np.generic) else value
+    log.write(json.dumps(record)+'\n')
+    log.flush()
+
+#Print the points of a list
+def printpoints(codes):
+    for i in codes:
+        print(' '.join(map(str, i)))
 
-# Time elapsed
-elapsed(time.time())
-sys.exit()
+def main(argv):
+    #Quiet mode: only the final results are printed
+    quiet = '-q' in argv or '--quiet' in argv
+    say = (lambda *args: None) if quiet else print
+    say(__doc__)
+    start = time.time()
+
+    #If no parameters are given
+    if not argv:
+        print('Input error:\nNo input parameters')
+        print('\nPlease, give at least one of the parameters below:')
+        print('\n-p: number of points. Integer number\n-d: number of dimensions. Integer number')
+        print('-c: number of cycles. Integer number\n-t: energy gradient tolerance. Float number')
+        print('-m: minimization method (classical, mirrored, global or symmetric). String')
+        print('-g: symmetry group of the symmetric method ('+', '.join(symmetry.GROUPS)+'). String')
+        print('-o: print points every step (y = yes and n = no). String')
+        print('-s: increment s by 1 (sum), a power of 2 (exp) or from the gain of Mdist (adaptive). String')
+        print('-k: number of nearest neighbours per point (0 = all points). Integer number')
+        print('-r: random seed of the initial points. Integer number')
+        print('-n: number of independent runs (multi-start). Integer number')
+        print('-j: number of parallel processes for multi-start. Integer number')
+        print('--checkpoint: write the minimization state to this file (.npz). String')
+        print('--every: write the checkpoint every N steps (default 1). Integer number')
+        print('--resume: continue the minimization saved in this checkpoint file. String')
+        print('--cache: directory of the point-set cache (warm start and storage). String')
+        print('--extend: add points (up to -p) to the points of this file (points.txt). String')
+        print('-q: quiet, print only the final results')
+        print('--log: write the progress as JSON lines to this file. String')
+        print('--profile: profile the minimization steps (cProfile) and write the statistics to this file. String')
+        print('\nStandard usage: python PDIM.py -p 10 -d 3 -c 10 -t 0.001 -m classical -o n -s exp')
+        print('\nNot clear enough? Read the documentation above! :)')
+        return
+
+    #Read inputs
+    longopts = ['npoints=', 'ndimensions=', 'ncycles=', 'tolerance=', 'minimization=', 'output=', 'sincrement=', 'neighbours=', 'seed=', 'nstarts=', 'nprocs=', 'checkpoint=', 'every=', 'resume=', 'cache=', 'group=', 'extend=', 'quiet', 'log=', 'profile=']
+    try:
+        variables, arguments = getopt.getopt(argv, 'p:d:c:t:m:o:s:k:r:n:j:g:q', longopts)
+    except getopt.GetoptError as e:
+        print('Input error:\n'+str(e))
+        return
+    names = {'-p': 'npoints', '-d': 'ndim', '-c': 'ncycles', '-t': 'tol', '-m': 'mtype', '-o': 'outfiles', '-s': 'sincr',
+             '-k': 'nneigh', '-r': 'seed', '-n': 'nstarts', '-j': 'nprocs', '--checkpoint': 'chkfile', '--every': 'chkevery', '--resume': 'resume', '--cache': 'cachedir', '-g': 'group', '--group': 'group', '--extend': 'extend', '-q': 'quiet', '--quiet': 'quiet', '--log': 'logfile', '--profile': 'profile',
+             '--npoints': 'npoints', '--ndimensions': 'ndim', '--ncycles': 'ncycles', '--tolerance': 'tol', '--minimization': 'mtype',
+             '--output': 'outfiles', '--sincrement': 'sincr', '--neighbours': 'nneigh', '--seed': 'seed', '--nstarts': 'nstarts', '--nprocs': 'nprocs'}
+    types = {'npoints': int, 'ndim': int, 'ncycles': int, 'tol': float, 'nneigh': int, 'seed': int, 'nstarts': int, 'nprocs': int, 'chkevery': int}
+    opts = {}
+    for var, arg in variables:
+        name = names[var]
+        try:
+            opts[name] = types.get(name, str)(arg)
+        except ValueError:
+            print('Input error:\nUnrecognized parameter for '+var+': '+str(arg))
+            return
+
+    #Resume from a checkpoint: the parameters not given are taken from it
+    state = None
+    if 'resume' in opts:
+        try:
+            state = load(opts['resume'])
+        except (OSError, ValueError):
+            print('Input error:\nUnable to read the checkpoint file (--resume): '+str(opts['resume']))
+            return
+        for name in ('npoints', 'ndim', 'ncycles', 'tol', 'mtype', 'sincr', 'nneigh', 'seed', 'group'):
+            if name not in opts and name in state: opts[name] = state[name].item()
+        if opts['seed'] < 0: del opts['seed']
+        #The resumed run keeps saving its state, to the same file by default
+        if 'chkfile' not in opts: opts['chkfile'] = opts['resume']
+        if 'chkevery' not in opts and 'every' in state: opts['chkevery'] = int(state['every'])
+
+    #Extend a set of points: the dimensions are taken from it
+    existing = None
+    if 'extend' in opts:
+        try:
+            existing = np.loadtxt(opts['extend'], ndmin=2)
+        except (OSError, ValueError):
+            print('Input error:\nUnable to read the points to extend (--extend): '+str(opts['extend']))
+            return
+        if 'npoints' not in opts:
+            print('Input error:\nPlease, give the number of points (-p) of the extended set (--extend)')
+            return
+        existing /= np.linalg.norm(existing, axis=1)[:, None]
+        opts['ndim'] = existing.shape[1]
+
+    #If not defined, set defaults
+    npoints = opts.get('npoints', 10)
+    ndim = opts.get('ndim', 3)
+    ncycles = opts.get('ncycles', 10)
+    tol = opts.get('tol', 0.001)
+    mtype = opts.get('mtype', 'classical')
+    outfiles = opts.get('outfiles', 'n')
+    sincr = opts.get('sincr', 'exp')
+    nneigh = opts.get('nneigh', 0)
+    #Without a seed, draw one so that the run can be reproduced
+    seed = opts.get('seed', newseed())
+    nstarts = opts.get('nstarts', 1)
+    nprocs = opts.get('nprocs', min(nstarts, multiprocessing.cpu_count()))
+    chkfile = opts.get('chkfile')
+    chkevery = opts.get('chkevery', 1)
+    cachedir = opts.get('cachedir')
+    group = opts.get('group', 'antipodal')
+    logfile = opts.get('logfile')
+    profile = opts.get('profile')
+
+    #Test inputs
+    try:
+        check(npoints, ndim, ncycles, tol, mtype, sincr, nneigh, group)
+    except ValueError as e:
+        print('Input error:\n'+str(e))
+        return
+    if outfiles not in ('y', 'n'):
+        print('Input error:\nUnrecognized parameter for -o: '+str(outfiles))
+        print('Please select one of the two output options:')
+        print('\t1) y: print points every minimization step\n\t2) n: do not print points every minimization step, only initial (start.txt) and final points (points.txt)')
+        return
+    if seed < 0:
+        print('Input error:\nThe random seed (-r) must be a positive integer number')
+        return
+    if nstarts < 1:
+        print('Input error:\nThe number of runs (-n) must be a positive integer number greater than 0')
+        return
+    if nprocs < 1:
+        print('Input error:\nThe number of processes (-j) must be a positive integer number greater than 0')
+        return
+    if chkevery < 1:
+        print('Input error:\nThe checkpoint interval (--every) must be a positive integer number greater than 0')
+        return
+    if existing is not None:
+        if state is not None or nstarts > 1:
+            print('Input error:\nA set of points (--extend) is extended by a single run. Do not use it with --resume or -n')
+            return
+        try:
+            checkextend(existing, npoints, mtype)
+        except ValueError as e:
+            print('Input error:\n'+str(e))
+            return
+    if state is not None:
+        if nstarts > 1:
+            print('Input error:\nA checkpoint (--resume) continues a single run. Do not use it with -n')
+            return
+        #Mirrored and symmetric codes keep the layout of their method
+        layout = lambda m, g: cachekey(m, g) if m in ('mirrored', 'symmetric') else None
+        if state['codes'].shape != (npoints, ndim) or layout(mtype, group) != layout(state['mtype'].item(), str(state.get('group', 'antipodal'))):
+            print('Input error:\nThe checkpoint (--resume) holds '+str(len(state['codes']))+' points in '+str(state['codes'].shape[1])+' dimensions ('+str(state['mtype'])+')')
+            print('Please, resume it with the same number of points (-p), dimensions (-d) and mirrored or symmetric minimization (-m, -g)')
+            return
+
+    #Print parameters
+    say('\t# Start #')
+    say('\n\tInitial parameters:\n')
+    say('Number of points:          '+str(npoints))
+    say('Number of dimensions:      '+str(ndim))
+    say('Number of cycles:          '+str(ncycles))
+    say('Energy gradient tolerance: '+str(tol))
+    say('Minimization method:       '+str(mtype))
+    if mtype == 'symmetric': say('Symmetry group:            '+str(group)+' (order '+str(symmetry.order(group, ndim))+')')
+    say('Output:                    '+str(outfiles))
+    say('s increment:               '+str(sincr))
+    say('Neighbours:                '+(str(nneigh) if nneigh else 'all'))
+    say('Random seed:               '+str(seed))
+    say('Number of runs:            '+str(nstarts))
+    if chkfile is not None: say('Checkpoint:                '+str(chkfile)+' (every '+str(chkevery)+' steps)')
+    if cachedir is not None: say('Cache:                     '+str(cachedir))
+    if existing is not None: say('Extended points:           '+str(opts['extend'])+' ('+str(len(existing))+' points)')
+
+    options = {'ncycles': ncycles, 'tol': tol, 'mtype': mtype, 'sincr': sincr, 'nneigh': nneigh, 'checkpoint': chkfile, 'every': chkevery, 'group': group}
+
+    #Progress log (JSON lines) and profiler of the minimization steps
+    log = open(logfile, 'w') if logfile is not None else None
+    logevent(log, 'start', start, npoints=npoints, ndim=ndim, seed=seed, nstarts=nstarts, **options)
+    global profiler
+    if profile is not None: profiler = cProfile.Profile()
+
+    #Last minimized codes, returned if the minimization stops
+    last = {'codes': None, 'energy': None}
+
+    #Print parameters of every cycle and step
+    def report(event, info):
+        if event == 'step': logevent(log, event, start, mdist=mdist(info['codes']), mangle=mangle(info['codes']), **info)
+        else: logevent(log, event, start, **info)
+        if event == 'cycle':
+            say('\n\tCycle '+str(info['cycle']+1)+' (s = '+str(info['s'])+')')
+        elif event == 'step':
+            say('\n\tStep '+str(info['step']))
+            say('Mdist:  '+str(mdist(info['codes'])))
+            say('Mangle: '+str(mangle(info['codes'])))
+            say('Energy: '+str(info['energy']))
+            last['codes'], last['energy'] = info['codes'], info['energy']
+            #Write the new codes to a file
+            if outfiles == 'y': stepfile('', event, info)
+        elif event == 'stop' and info.get('failed'):
+            say('\n\tThe local minimizer failed at s = '+str(info['s'])+': minimization finished')
+        elif event == 'stop':
+            say('\n\tMangle has not improved for two cycles: minimization finished')
+
+    try:
+        if state is not None:
+            say('\n\tResuming '+str(opts['resume'])+': cycle '+str(int(state['cycle'])+1)+', step '+str(int(state['step'])))
+            last['codes'], last['energy'] = state['codes'], state['Ef'].item()
+            codes, Ef, step = run(state['codes'], seed=seed, callback=report, state=state, **options)
+
+        elif existing is None and cachedir is not None and cache.lookup(npoints, ndim, cachekey(mtype, group), cachedir) is not None:
+            codes = cache.lookup(npoints, ndim, cachekey(mtype, group), cachedir)
+            say('\n\tCached points: no minimization needed')
+            #Energy of the cached codes at the s of the last cycle
+            s = sinitial(ndim)
+            for cycle in range(ncycles - 1): s = sincrement(s, sincr)
+            Ef = ener(codes, mdist(codes), s, nneigh, sincr == 'adaptive')
+
+        elif nstarts == 1:
+            codes, source, active = None, None, None
+            if existing is not None:
+                #New points at the largest gaps, only them and their neighbours are minimized
+                codes, active = insert(existing, npoints, seed)
+                say('\n\tExtending '+str(opts['extend'])+': '+str(npoints - len(existing))+' new points, '+str(len(active))+' points minimized')
+            elif cachedir is not None: codes, source = cache.warmstart(npoints, ndim, cachekey(mtype, group), cachedir, seed)
+            if codes is None: codes = initial(npoints, ndim, mtype, seed, group)
+            elif source is not None: say('\n\tWarm start from '+str(source))
+            say('\n\tInitial Points:\n')
+
+            #Print the initial codes
+            if not quiet: printpoints(codes)
+
+            initialdist = mdist(codes)
+            last['codes'], last['energy'] = codes, ener(codes, initialdist, sinitial(ndim), nneigh, sincr == 'adaptive')
+            say('\nMdist:  '+str(initialdist))
+            say('Mangle: '+str(mangle(codes)))
+            say('Energy: '+str(last['energy']))
+
+            #Write the initial codes to a file
+            writepoints('start.txt', codes)
+
+            codes, Ef, step = run(codes, seed=seed, callback=report, active=active, **options)
+            if existing is not None:
+                say('\nLargest displacement of the extended points: '+str(np.linalg.norm(codes[:len(existing)] - existing, axis=1).max()))
+
+        else:
+            say('Number of processes:       '+str(nprocs))
+            say('\n\tRuns:\n')
+            say('Seed        Mdist                Mangle               Energy               Steps  Time (s)')
+            best = None
+            for result in multistart(npoints, ndim, range(seed, seed + nstarts), nprocs, outfiles=(outfiles == 'y'), **options):
+                say('%-11d %-20.15f %-20.15f %-20.6g %-6d %.2f' % (result['seed'], result['mdist'], result['mangle'], result['energy'], result['steps'], result['duration']))
+                logevent(log, 'run', start, **result)
+                #Keep the run with the highest Mdist (then Mangle)
+                if best is None or (result['mdist'], result['mangle']) > (best['mdist'], best['mangle']):
+                    best = result
+                    last['codes'], last['energy'] = best['points'], best['energy']
+            say('\nBest seed: '+str(best['seed']))
+            codes, Ef = best['points'], best['energy']
+
+            #Write the initial codes of the best run to a file
+            writepoints('start.txt', initial(npoints, ndim, mtype, best['seed'], group))
+
+    #If stopped, save the last minimized codes
+    except (KeyboardInterrupt, MinimizationError) as e:
+        if profiler is not None: profiler.disable()
+        if isinstance(e, MinimizationError): print('\n\t'+str(e))
+        print('\n\tMinimization has stopped!\n')
+        logevent(log, 'stopped', start, error=str(e), **stats)
+        if log is not None: log.close()
+        if last['codes'] is None: return
+        print('Last Mdist:  '+str(mdist(last['codes'])))
+        print('Last Mangle: '+str(mangle(last['codes'])))
+        print('Last Energy: '+str(last['energy']))
+        say('\n\tLast Points:\n')
+        if not quiet: printpoints(last['codes'])
+        writepoints('points.txt', last['codes'])
+        elapsed(start)
+        return
+
+    ###Termination###
+
+    #Store the final codes in the cache
+    if cachedir is not None: cache.store(codes, cachekey(mtype, group), cachedir)
+
+    #Print variables
+    print('\n\t# Termination #\n')
+    print('Final Mdist:  '+str(mdist(codes)))
+    print('Final Mangle: '+str(mangle(codes)))
+    print('Covering radius: '+str(metrics.covering(codes))+' ('+str(metrics.degrees(metrics.covering(codes)))+' degrees)')
+    print('Final Energy: '+str(Ef))
+    say('\n\tFinal Points:\n')
+
+    #Print the final codes
+    if not quiet: printpoints(codes)
+
+    #Save the final codes
+    writepoints('points.txt', codes)
+
+    #Profile of the minimization steps
+    if profiler is not None:
+        profiler.dump_stats(profile)
+        if not quiet: pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+
+    logevent(log, 'end', start, mdist=mdist(codes), mangle=mangle(codes), energy=Ef, covering=metrics.covering(codes), **stats)
+    if log is not None: log.close()
+
+    # Time elapsed
+    elapsed(start)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,176 @@
+"""
+Benchmark of PDIM against the converged sets of the points directory.
+
+For every set D-N.txt, every minimization method (-m) and s increment (-s),
+PDIM minimizes N random points in D dimensions (seed -r) and records:
+- Time: wall time of the minimization (seconds)
+- Steps: minimization steps
+- Evals: evaluations of the objective and its gradient (computed together)
+- Peak: peak memory allocated during the minimization (MB, tracemalloc).
+  Tracing slows down the methods by different amounts, so every case is
+  run twice: once timed, then once traced for the peak memory
+- Mdist/Mangle: final values, and the ones of the reference set
+- Reached: time (and step) when Mdist reached the reference Mdist
+  within a relative tolerance (--rtol), or - if it never did
+
+The results can be saved (--save) and compared with a saved baseline
+(--baseline): a case is a regression if it is slower than the baseline by
+more than --slower (relative) or ends with a lower Mdist. The exit status
+is then 1.
+
+Usage:
+python benchmark.py -m global,classical -s exp,adaptive -c 12 -r 1 --save base.json
+python benchmark.py -m global -f 3-12,4-24 --baseline base.json
+
+-m: minimization methods (classical, mirrored or global), comma separated. Default: global
+-s: s increments (sum, exp or adaptive), comma separated. Default: exp,adaptive
+-c: number of cycles. Default: 12
+-t: energy gradient tolerance. Default: 0.001
+-r: random seed of the initial points. Default: 1
+-f: sets to run (D-N), comma separated. Default: all sets of the points directory
+--rtol: relative tolerance to reach the reference Mdist. Default: 0.001
+--save: write the results to this file (.json)
+--baseline: compare the results with this file (.json)
+--slower: relative slow down allowed with respect to the baseline. Default: 0.2
+
+Author: Antoniel A. S. Gomes (antonielaugusto@gmail.com)
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import glob
+import getopt
+import tracemalloc
+import numpy as np
+
+import PDIM
+import cache
+import metrics
+
+#Reference sets of the points directory as a list of (ndim, npoints, points)
+def references(sets=None):
+    refs = []
+    for path in glob.glob(os.path.join(cache.POINTS, '*-*.txt')):
+        match = re.match(r'(\d+)-(\d+)\.txt$', os.path.basename(path))
+        if not match or (sets is not None and match.group(0)[:-4] not in sets): continue
+        x = cache.read(path)
+        #Empty files have no reference
+        if x is None: continue
+        refs.append((int(match.group(1)), int(match.group(2)), x / np.linalg.norm(x, axis=1)[:, None]))
+    return sorted(refs, key=lambda r: (r[0], r[1]))
+
+#Minimize one case, calling track(event, info) at every step
+#Returns the points, the number of steps and the error of a failed minimization
+def minimize(ndim, npoints, mtype, sincr, ncycles, tol, seed, track=None):
+    #Codes of the last step, reported if the minimization fails
+    last = {'codes': PDIM.initial(npoints, ndim, mtype, seed), 'step': 0}
+    def callback(event, info):
+        if event != 'step': return
+        last['codes'], last['step'] = info['codes'], info['step']
+        if track: track(info)
+    try:
+        codes, E, steps = PDIM.run(last['codes'], ncycles, tol, mtype, sincr, seed=seed, callback=callback)
+    except PDIM.MinimizationError as e:
+        return last['codes'], last['step'], str(e)
+    return codes, steps, None
+
+#Minimize one case and return its measures as a dict
+#The time is measured without tracing, the peak memory in a second (traced) run
+def case(ndim, npoints, ref, mtype, sincr, ncycles=12, tol=0.001, seed=1, rtol=1e-3):
+    target = metrics.mdist(ref) * (1.0 - rtol)
+    reached = {'time': None, 'step': None}
+    def track(info):
+        if reached['time'] is None and metrics.mdist(info['codes']) >= target:
+            reached['time'], reached['step'] = time.time() - start, info['step']
+    PDIM.stats.clear()
+    start = time.time()
+    codes, steps, error = minimize(ndim, npoints, mtype, sincr, ncycles, tol, seed, track)
+    end = time.time() - start
+    stats = PDIM.stats.copy()
+    tracemalloc.start()
+    minimize(ndim, npoints, mtype, sincr, ncycles, tol, seed)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'ndim': ndim, 'npoints': npoints, 'mtype': mtype, 'sincr': sincr, 'ncycles': ncycles, 'tol': tol, 'seed': seed,
+            'time': end, 'steps': steps, 'evals': stats['nfev'], 'iterations': stats['nit'], 'peak': peak / 1024.0**2,
+            'mdist': metrics.mdist(codes), 'mangle': metrics.mangle(codes), 'refmdist': metrics.mdist(ref), 'refmangle': metrics.mangle(ref),
+            'reached': reached['time'], 'rstep': reached['step'], 'error': error}
+
+#Name of a case in the results
+def key(result):
+    return '%d-%d %s %s' % (result['ndim'], result['npoints'], result['mtype'], result['sincr'])
+
+#Print a result as a row of the table
+def row(result):
+    reached = '-' if result['reached'] is None else '%.2f (%d)' % (result['reached'], result['rstep'])
+    if result['error']: reached += ' '+result['error']
+    print('%-8s %-10s %-9s %9.2f %6d %8d %9.1f %-10.6f %-10.6f %-10.4f %-10.4f %s' % ('%d-%d' % (result['ndim'], result['npoints']),
+          result['mtype'], result['sincr'], result['time'], result['steps'], result['evals'], result['peak'],
+          result['mdist'], result['refmdist'], result['mangle'], result['refmangle'], reached))
+
+#Compare results with a baseline. Returns the number of regressions
+def compare(results, baseline, slower=0.2):
+    print('\n\tBaseline comparison:\n')
+    print('Case                         Time      Base      Ratio  Mdist      Base')
+    regressions = 0
+    for result in results:
+        base = baseline.get(key(result))
+        if base is None:
+            print('%-28s not in the baseline' % key(result))
+            continue
+        ratio = result['time'] / base['time'] if base['time'] > 0 else np.inf
+        flags = []
+        if ratio > 1.0 + slower: flags.append('SLOWER')
+        if result['mdist'] < base['mdist'] - 1e-6: flags.append('WORSE')
+        regressions += bool(flags)
+        print('%-28s %-9.2f %-9.2f %-6.2f %-10.6f %-10.6f %s' % (key(result), result['time'], base['time'], ratio, result['mdist'], base['mdist'], ' '.join(flags)))
+    return regressions
+
+def main(argv):
+    longopts = ['rtol=', 'save=', 'baseline=', 'slower=']
+    try:
+        variables, arguments = getopt.getopt(argv, 'm:s:c:t:r:f:', longopts)
+        opts = dict(variables)
+        mtypes = opts.get('-m', 'global').split(',')
+        sincrs = opts.get('-s', 'exp,adaptive').split(',')
+        ncycles = int(opts.get('-c', 12))
+        tol = float(opts.get('-t', 0.001))
+        seed = int(opts.get('-r', 1))
+        sets = opts['-f'].split(',') if '-f' in opts else None
+        rtol = float(opts.get('--rtol', 1e-3))
+        slower = float(opts.get('--slower', 0.2))
+        baseline = None
+        if '--baseline' in opts:
+            with open(opts['--baseline']) as f:
+                baseline = json.load(f)
+    except (getopt.GetoptError, ValueError, OSError) as e:
+        print('Input error:\n'+str(e))
+        return 2
+
+    refs = references(sets)
+    print('Seed '+str(seed)+', '+str(ncycles)+' cycles, tolerance '+str(tol)+'\n')
+    print('Set      Method     s          Time (s)  Steps    Evals  Peak (MB) Mdist      Ref        Mangle     Ref        Reached (s)')
+    results = []
+    for ndim, npoints, ref in refs:
+        for mtype in mtypes:
+            for sincr in sincrs:
+                try:
+                    PDIM.check(npoints, ndim, ncycles, tol, mtype, sincr)
+                except ValueError as e:
+                    print('Input error:\n'+str(e))
+                    return 2
+                results.append(case(ndim, npoints, ref, mtype, sincr, ncycles, tol, seed, rtol))
+                row(results[-1])
+
+    if '--save' in opts:
+        with open(opts['--save'], 'w') as f:
+            json.dump({key(r): r for r in results}, f, indent=1)
+    if baseline is not None and compare(results, baseline, slower):
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,171 @@
+"""
+Cache of minimized sets of points for PDIM.
+
+Sets are keyed by (number of points, number of dimensions, minimization
+method). A set is looked up in an on-disk cache of previous results
+(.npy files) and in the converged tables shipped in the points
+directory (D-N.txt, valid for any method). On a miss, the nearest
+available set is used as a warm start: points are added or removed to
+reach N, and sets of lower dimensions are embedded in D dimensions.
+New results are stored in the on-disk cache, whose size is bounded:
+the least recently used sets are evicted first.
+
+Usage:
+import cache
+points = cache.lookup(12, 3, 'classical')
+start, source = cache.warmstart(14, 3, 'classical')
+cache.store(points, 'classical')
+
+The cache directory is $PDIM_CACHE (default ~/.cache/pdim).
+
+Author: Antoniel A. S. Gomes (antonielaugusto@gmail.com)
+"""
+
+import os
+import re
+import glob
+import numpy as np
+from scipy.spatial import cKDTree
+
+import pairwise
+import metrics
+
+#Default cache directory and maximum size (bytes)
+CACHEDIR = os.environ.get('PDIM_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'pdim'))
+MAXBYTES = 256 * 1024**2
+
+#Converged sets shipped with PDIM (D-N.txt)
+POINTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'points')
+
+#Name of a cached set
+def filename(npoints, ndim, mtype, cachedir=CACHEDIR):
+    return os.path.join(cachedir, '%d-%d-%s.npy' % (ndim, npoints, mtype))
+
+#Available sets as (ndim, npoints, mtype, path). Shipped sets have mtype None
+def available(cachedir=CACHEDIR):
+    sets = []
+    for path in glob.glob(os.path.join(cachedir, '*-*-*.npy')):
+        match = re.match(r'(\d+)-(\d+)-(\w+)\.npy$', os.path.basename(path))
+        if match: sets.append((int(match.group(1)), int(match.group(2)), match.group(3), path))
+    for path in glob.glob(os.path.join(POINTS, '*-*.txt')):
+        match = re.match(r'(\d+)-(\d+)\.txt$', os.path.basename(path))
+        if match: sets.append((int(match.group(1)), int(match.group(2)), None, path))
+    return sets
+
+#Read a set of points. Returns None if the file is empty or unreadable
+def read(path):
+    try:
+        if os.path.getsize(path) == 0: return None
+        if path.endswith('.npy'): x = np.load(path)
+        else: x = np.loadtxt(path, ndmin=2)
+    except (OSError, ValueError):
+        return None
+    if x.ndim != 2 or x.size == 0: return None
+    return x
+
+#Reorder an antipodal set as its half followed by the mirrored half
+#(the layout of the mirrored method). Returns None if the set is not antipodal
+def antipodal(x, tol=1e-4):
+    dist, near = cKDTree(x).query(-x)
+    if dist.max() > tol or np.any(near == np.arange(len(x))): return None
+    half = []
+    for i in range(len(x)):
+        if near[i] > i: half.append(i)
+    if 2 * len(half) != len(x): return None
+    half = x[half]
+    return np.vstack([half, -half])
+
+#Stored set of points of (npoints, ndim, mtype), or None on a miss
+def lookup(npoints, ndim, mtype='classical', cachedir=CACHEDIR):
+    path = filename(npoints, ndim, mtype, cachedir)
+    x = read(path) if os.path.exists(path) else None
+    if x is not None and x.shape == (npoints, ndim):
+        #Keep track of the last use for the eviction
+        os.utime(path)
+        return x
+    #Shipped sets do not have the layout of a symmetry group
+    if mtype not in ('classical', 'mirrored', 'global'): return None
+    x = read(os.path.join(POINTS, '%d-%d.txt' % (ndim, npoints)))
+    if x is None or x.shape != (npoints, ndim): return None
+    x /= np.linalg.norm(x, axis=1)[:, None]
+    if mtype == 'mirrored': return antipodal(x)
+    return x
+
+#Keep only one point of every antipodal pair
+def hemisphere(x):
+    d0 = metrics.mdist(x)
+    dist, near = cKDTree(x).query(-x)
+    keep = np.ones(len(x), dtype=bool)
+    for i in range(len(x)):
+        if keep[i] and dist[i] < 0.5 * d0 and near[i] != i: keep[near[i]] = False
+    return x[keep]
+
+#Add or remove points to reach npoints
+#Points are removed where they are closest to each other, and added at the
+#largest gaps (see pairwise.farthest)
+def resize(x, npoints, rng):
+    while len(x) > npoints:
+        dist, near = cKDTree(x).query(x, k=2)
+        x = np.delete(x, np.argmin(dist[:, 1]), axis=0)
+    if len(x) < npoints:
+        x = np.vstack([x, pairwise.farthest(x, npoints - len(x), rng)[0]])
+    return x
+
+#Embed a set of points of lower dimensions in ndim dimensions
+#The new coordinates are slightly perturbed, otherwise their gradient is zero
+def embed(x, ndim, rng):
+    x = np.hstack([x, np.zeros((len(x), ndim - x.shape[1]))])
+    x += 1e-2 * rng.standard_normal(x.shape)
+    return x / np.linalg.norm(x, axis=1)[:, None]
+
+#Initial points built from the nearest available set
+#The nearest set has the same dimensions and the closest number of points,
+#otherwise the highest lower dimensions
+#Returns (points, path of the set used) or (None, None) if nothing is available
+def warmstart(npoints, ndim, mtype='classical', cachedir=CACHEDIR, seed=None):
+    #Symmetric sets must be built from the representatives of their group
+    if mtype not in ('classical', 'mirrored', 'global'): return None, None
+    rng = np.random.default_rng(seed)
+    sets = [c for c in available(cachedir) if c[0] <= ndim]
+    sets.sort(key=lambda c: (ndim - c[0], abs(c[1] - npoints), c[2] is None))
+    for d, n, method, path in sets:
+        x = read(path)
+        if x is None or x.shape[1] != d: continue
+        x = x / np.linalg.norm(x, axis=1)[:, None]
+        if mtype == 'mirrored':
+            x = resize(hemisphere(x), npoints // 2, rng)
+        else:
+            x = resize(x, npoints, rng)
+        if d < ndim: x = embed(x, ndim, rng)
+        if mtype == 'mirrored': x = np.vstack([x, -x])
+        return x, path
+    return None, None
+
+#Remove the least recently used sets until the cache fits in maxbytes
+def evict(cachedir=CACHEDIR, maxbytes=MAXBYTES, keep=None):
+    files = [(os.path.getmtime(f), os.path.getsize(f), f) for f in glob.glob(os.path.join(cachedir, '*-*-*.npy'))]
+    total = sum(size for mtime, size, f in files)
+    for mtime, size, f in sorted(files):
+        if total <= maxbytes: break
+        if f == keep: continue
+        os.remove(f)
+        total -= size
+
+#Store a minimized set of points in the cache
+#An existing set is only replaced by one with a higher Mdist
+#Returns True if the set was stored
+def store(x, mtype='classical', cachedir=CACHEDIR, maxbytes=MAXBYTES):
+    x = np.asarray(x, dtype=float)
+    path = filename(len(x), x.shape[1], mtype, cachedir)
+    if os.path.exists(path):
+        old = read(path)
+        if old is not None and old.shape == x.shape and metrics.mdist(old) >= metrics.mdist(x):
+            os.utime(path)
+            return False
+    os.makedirs(cachedir, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, x)
+    os.replace(tmp, path)
+    evict(cachedir, maxbytes, keep=path)
+    return True
@@ -0,0 +1,123 @@
+"""
+Quality metrics of a set of points on the unit sphere.
+
+- Minimal separation (Mdist) and minimal angle (Mangle), from the nearest
+  neighbour of every point (KD-tree), O(N log N)
+- Histogram of the angles between neighbours (k nearest) or all pairs
+  (computed by blocks, see pairwise.py)
+- Covering radius, estimated by Monte Carlo: the largest distance from
+  random points of the sphere to their nearest point of the set. It is a
+  lower bound that tightens with the number of samples
+
+The results are cached per configuration (hash of the coordinates), so a
+set of points is not analysed again when it is printed several times.
+
+Usage:
+python metrics.py points.txt [samples]
+
+Author: Antoniel A. S. Gomes (antonielaugusto@gmail.com)
+"""
+
+import sys
+import hashlib
+import collections
+import numpy as np
+from scipy.spatial import cKDTree
+
+import pairwise
+
+#Number of configurations kept in memory
+MEMO = 16
+memo = collections.OrderedDict()
+
+#Value of a metric of a configuration, computed once
+def cached(name, x, function, *args):
+    x = np.ascontiguousarray(x, dtype=float)
+    key = (name, x.shape, hashlib.sha1(x.tobytes()).hexdigest()) + args
+    if key in memo:
+        memo.move_to_end(key)
+        return memo[key]
+    value = function(x, *args)
+    memo[key] = value
+    if len(memo) > MEMO: memo.popitem(last=False)
+    return value
+
+#Chord length between unit vectors to angle (degrees)
+def degrees(chord):
+    return np.degrees(2.0 * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0)))
+
+#Distance of every point to its nearest neighbour
+def nearest(x):
+    return cached('nearest', x, lambda x: cKDTree(x).query(x, k=2, workers=-1)[0][:, 1])
+
+#Minimal Euclidean distance of a set of points
+def mdist(x):
+    return nearest(x).min()
+
+#Minimal angle (degrees) of a set of unit vectors
+def mangle(x):
+    return degrees(mdist(x))
+
+#Histogram of the angles (degrees) between the k nearest neighbours of every
+#point, or between all pairs if k is None. Returns (counts, edges)
+def histogram(x, bins=180, k=None, block=pairwise.BLOCK):
+    def angles(x, bins, k):
+        edges = np.linspace(0.0, 180.0, bins + 1)
+        if k is not None:
+            i, j = pairwise.neighbour_pairs(pairwise.neighbours(x, k))
+            return np.histogram(degrees(np.linalg.norm(x[i] - x[j], axis=1)), edges)[0], edges
+        counts = np.zeros(bins, dtype=int)
+        for i0, i1, j0, j1 in pairwise.tiles(len(x), block):
+            c = pairwise.pairs(x[i0:i1] @ x[j0:j1].T, i0, j0)
+            counts += np.histogram(np.degrees(np.arccos(np.clip(c, -1.0, 1.0))), edges)[0]
+        return counts, edges
+    return cached('histogram', x, angles, bins, k)
+
+#Covering radius (Euclidean) estimated from random points of the sphere
+def covering(x, samples=100000, seed=0):
+    def radius(x, samples, seed):
+        rng = np.random.default_rng(seed)
+        tree = cKDTree(x)
+        r = 0.0
+        #Samples by chunks to bound memory
+        for n in range(0, samples, 100000):
+            p = rng.standard_normal((min(100000, samples - n), x.shape[1]))
+            p /= np.linalg.norm(p, axis=1)[:, None]
+            r = max(r, tree.query(p, workers=-1)[0].max())
+        return r
+    return cached('covering', x, radius, samples, seed)
+
+#All metrics of a set of points as a dict
+def summary(x, samples=100000, seed=0):
+    d = nearest(x)
+    r = covering(x, samples, seed)
+    return {'npoints': len(x), 'ndim': np.shape(x)[1], 'mdist': d.min(), 'mangle': degrees(d.min()),
+            'mean': d.mean(), 'std': d.std(), 'covering': r, 'cangle': degrees(r),
+            #Covering radius over packing radius: 1 for a perfect distribution
+            'ratio': r / (0.5 * d.min()) if d.min() > 0 else np.inf}
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        return
+    try:
+        x = np.loadtxt(argv[0], ndmin=2)
+        samples = int(argv[1]) if len(argv) > 1 else 100000
+    except (OSError, ValueError) as e:
+        print('Input error:\n'+str(e))
+        return
+    m = summary(x, samples)
+    print('Number of points:      '+str(m['npoints']))
+    print('Number of dimensions:  '+str(m['ndim']))
+    print('Mdist:                 '+str(m['mdist']))
+    print('Mangle:                '+str(m['mangle']))
+    print('Nearest distance:      '+str(m['mean'])+' +- '+str(m['std']))
+    print('Covering radius:       '+str(m['covering'])+' ('+str(m['cangle'])+' degrees, '+str(samples)+' samples)')
+    print('Covering/packing:      '+str(m['ratio']))
+    print('\n\tNearest-neighbour angles:\n')
+    counts, edges = histogram(x, 36, 1)
+    for c, e0, e1 in zip(counts, edges[:-1], edges[1:]):
+        if c: print('%5.1f-%5.1f %6d %s' % (e0, e1, c, '#' * int(round(50.0 * c / counts.max()))))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,245 @@
+"""
+Pairwise kernels used by PDIM.
+
+The repulsion energy sum((initialdist/d)**s) and its gradient
+are evaluated with NumPy from Gram-matrix blocks, so no Python loop
+runs over point pairs. The points are split in blocks of `block` rows
+and only one (block x block) tile is kept in memory at a time, which
+bounds memory once N reaches tens of thousands of points.
+
+For large s only the nearest neighbours of each point contribute to the
+energy. The neighbour-list kernels evaluate the energy and its gradient
+over the k nearest neighbours of every point, found with a KD-tree, so
+they scale as O(N*k) instead of O(N^2).
+
+The minimal distance and angle of a set of points are in metrics.py.
+
+The log-space kernels return ln(E) and its gradient. The energy terms
+are summed relative to the largest one (log-sum-exp), so they never
+overflow, whatever the value of s.
+
+Author: Antoniel A. S. Gomes (antonielaugusto@gmail.com)
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+#Default number of rows per block (a 2048 x 2048 tile takes 32 MB)
+BLOCK = 2048
+
+#Yield the (i, j) tiles of the upper triangle of the pair matrix
+def tiles(n, block=BLOCK):
+    for i0 in range(0, n, block):
+        i1 = min(i0 + block, n)
+        for j0 in range(i0, n, block):
+            j1 = min(j0 + block, n)
+            yield i0, i1, j0, j1
+
+#Squared Euclidean distances between two blocks of points
+def sqdist(a, b):
+    d2 = np.einsum('ij,ij->i', a, a)[:, None] + np.einsum('ij,ij->i', b, b)[None, :] - 2.0 * (a @ b.T)
+    return np.maximum(d2, 0.0)
+
+#Values of a tile that belong to distinct pairs (i < j)
+def pairs(tile, i0, j0):
+    if i0 != j0:
+        return tile.ravel()
+    return tile[np.triu_indices(tile.shape[0], k=1, m=tile.shape[1])]
+
+#Energy of a set of points (global energy): sum of (d0/d)**s over all pairs
+def ener(x, d0, s, block=BLOCK):
+    x = np.asarray(x, dtype=float)
+    E = 0.0
+    for i0, i1, j0, j1 in tiles(len(x), block):
+        d2 = pairs(sqdist(x[i0:i1], x[j0:j1]), i0, j0)
+        E += np.sum((d0 * d0 / d2) ** (0.5 * s))
+    return E
+
+#Energy of one point against a set of points and its analytic gradient
+#E(x) = sum((d0/d)**s), dE/dx = -s * sum((d0/d)**s * (x - p) / d**2)
+def point_ener(x, others, d0, s):
+    diff = x - others
+    d2 = np.einsum('ij,ij->i', diff, diff)
+    e = (d0 * d0 / d2) ** (0.5 * s)
+    return np.sum(e), -s * ((e / d2) @ diff)
+
+#Energy of a set of points and its analytic gradient with respect to every point
+def ener_grad(x, d0, s, block=BLOCK):
+    x = np.asarray(x, dtype=float)
+    E = 0.0
+    G = np.zeros_like(x)
+    for i0, i1, j0, j1 in tiles(len(x), block):
+        a, b = x[i0:i1], x[j0:j1]
+        d2 = sqdist(a, b)
+        #A point does not interact with itself
+        if i0 == j0:
+            np.fill_diagonal(d2, np.inf)
+        e = (d0 * d0 / d2) ** (0.5 * s)
+        w = e / d2
+        G[i0:i1] -= s * (w.sum(axis=1)[:, None] * a - w @ b)
+        if i0 == j0:
+            #Diagonal tiles hold every pair twice
+            E += 0.5 * np.sum(e)
+        else:
+            E += np.sum(e)
+            G[j0:j1] -= s * (w.sum(axis=0)[:, None] * b - w.T @ a)
+    return E, G
+
+###Neighbour-list kernels###
+
+#Indices (N, k) of the k nearest neighbours of every point, itself excluded
+def neighbours(x, k):
+    x = np.asarray(x, dtype=float)
+    k = min(k, len(x) - 1)
+    near = cKDTree(x).query(x, k=k+1)[1]
+    keep = near != np.arange(len(x))[:, None]
+    #Duplicated points may leave a point out of its own list: keep k of them
+    keep[keep.sum(axis=1) > k, -1] = False
+    return near[keep].reshape(len(x), k)
+
+#Largest ratio, over all points, between the energy terms of the k-th and of the nearest neighbour
+def truncation(x, near, s):
+    x = np.asarray(x, dtype=float)
+    d1 = np.linalg.norm(x - x[near[:, 0]], axis=1)
+    dk = np.linalg.norm(x - x[near[:, -1]], axis=1)
+    return np.max((d1 / dk) ** s)
+
+#Distinct pairs (i < j) of a neighbour list
+def neighbour_pairs(near):
+    n = len(near)
+    i = np.repeat(np.arange(n), near.shape[1])
+    j = near.ravel()
+    key = np.unique(np.minimum(i, j) * n + np.maximum(i, j))
+    return key // n, key % n
+
+#Energy of a set of points over a list of pairs
+def pairs_ener(x, pairs, d0, s):
+    x = np.asarray(x, dtype=float)
+    i, j = pairs
+    diff = x[i] - x[j]
+    d2 = np.einsum('ij,ij->i', diff, diff)
+    return np.sum((d0 * d0 / d2) ** (0.5 * s))
+
+#Energy of a set of points over a list of pairs and its analytic gradient
+def pairs_ener_grad(x, pairs, d0, s):
+    x = np.asarray(x, dtype=float)
+    i, j = pairs
+    diff = x[i] - x[j]
+    d2 = np.einsum('ij,ij->i', diff, diff)
+    e = (d0 * d0 / d2) ** (0.5 * s)
+    f = (-s * e / d2)[:, None] * diff
+    G = np.empty_like(x)
+    for c in range(x.shape[1]):
+        G[:, c] = np.bincount(i, f[:, c], len(x)) - np.bincount(j, f[:, c], len(x))
+    return np.sum(e), G
+
+###Log-space kernels###
+
+#Logarithm of the energy terms (d0/d)**s from squared distances
+def logterms(d2, d0, s):
+    with np.errstate(divide='ignore'):
+        return 0.5 * s * np.log(d0 * d0 / d2)
+
+#Log-energy of a set of points: ln(sum((d0/d)**s)) over all pairs
+def logener(x, d0, s, block=BLOCK):
+    x = np.asarray(x, dtype=float)
+    m, tot = -np.inf, 0.0
+    for i0, i1, j0, j1 in tiles(len(x), block):
+        t = logterms(pairs(sqdist(x[i0:i1], x[j0:j1]), i0, j0), d0, s)
+        if not t.size: continue
+        #Rescale the sum to the largest term found so far
+        if t.max() > m:
+            tot *= np.exp(m - t.max())
+            m = t.max()
+        tot += np.sum(np.exp(t - m))
+    return m + np.log(tot) if tot > 0 else -np.inf
+
+#Log-energy of one point against a set of points and its analytic gradient
+def point_logener(x, others, d0, s):
+    diff = x - others
+    d2 = np.einsum('ij,ij->i', diff, diff)
+    t = logterms(d2, d0, s)
+    m = t.max()
+    e = np.exp(t - m)
+    tot = np.sum(e)
+    return m + np.log(tot), -s * ((e / d2) @ diff) / tot
+
+#Log-energy of a set of points and its analytic gradient with respect to every point
+def logener_grad(x, d0, s, block=BLOCK):
+    x = np.asarray(x, dtype=float)
+    m, tot = -np.inf, 0.0
+    G = np.zeros_like(x)
+    for i0, i1, j0, j1 in tiles(len(x), block):
+        a, b = x[i0:i1], x[j0:j1]
+        d2 = sqdist(a, b)
+        #A point does not interact with itself
+        if i0 == j0:
+            np.fill_diagonal(d2, np.inf)
+        t = logterms(d2, d0, s)
+        if t.max() == -np.inf: continue
+        #Rescale the sum and the gradient to the largest term found so far
+        if t.max() > m:
+            scale = np.exp(m - t.max())
+            tot, G = tot * scale, G * scale
+            m = t.max()
+        e = np.exp(t - m)
+        w = e / d2
+        G[i0:i1] -= s * (w.sum(axis=1)[:, None] * a - w @ b)
+        if i0 == j0:
+            #Diagonal tiles hold every pair twice
+            tot += 0.5 * np.sum(e)
+        else:
+            tot += np.sum(e)
+            G[j0:j1] -= s * (w.sum(axis=0)[:, None] * b - w.T @ a)
+    if tot == 0: return -np.inf, G
+    return m + np.log(tot), G / tot
+
+#Log-energy of a set of points over a list of pairs
+def pairs_logener(x, pairs, d0, s):
+    x = np.asarray(x, dtype=float)
+    i, j = pairs
+    diff = x[i] - x[j]
+    t = logterms(np.einsum('ij,ij->i', diff, diff), d0, s)
+    m = t.max()
+    return m + np.log(np.sum(np.exp(t - m)))
+
+#Log-energy of a set of points over a list of pairs and its analytic gradient
+def pairs_logener_grad(x, pairs, d0, s):
+    x = np.asarray(x, dtype=float)
+    i, j = pairs
+    diff = x[i] - x[j]
+    d2 = np.einsum('ij,ij->i', diff, diff)
+    t = logterms(d2, d0, s)
+    m = t.max()
+    e = np.exp(t - m)
+    tot = np.sum(e)
+    f = (-s * e / d2 / tot)[:, None] * diff
+    G = np.empty_like(x)
+    for c in range(x.shape[1]):
+        G[:, c] = np.bincount(i, f[:, c], len(x)) - np.bincount(j, f[:, c], len(x))
+    return m + np.log(tot), G
+
+###Insertion###
+
+#k new points of the unit sphere at the largest gaps of a set of points
+#(farthest-point sampling over random candidates of the sphere): every new
+#point is the candidate farthest from the points and the new points chosen
+#Returns the new points (k, D) and their distances to the nearest point
+def farthest(x, k, rng, ncand=None):
+    x = np.asarray(x, dtype=float)
+    if ncand is None: ncand = min(200000, 100 * (len(x) + k))
+    cand = rng.standard_normal((ncand, x.shape[1]))
+    cand /= np.linalg.norm(cand, axis=1)[:, None]
+    dist = cKDTree(x).query(cand)[0] if len(x) else np.full(ncand, np.inf)
+    new = np.empty((k, x.shape[1]))
+    gaps = np.empty(k)
+    for i in range(k):
+        j = np.argmax(dist)
+        new[i], gaps[i] = cand[j], dist[j]
+        dist = np.minimum(dist, np.linalg.norm(cand - cand[j], axis=1))
+    return new, gaps
+
+#Indices of the points closer than radius (one per centre) to any centre
+def around(x, centres, radius):
+    near = cKDTree(np.asarray(x, dtype=float)).query_ball_point(centres, radius)
+    return np.unique(np.concatenate([np.asarray(i, dtype=int) for i in near] + [np.zeros(0, dtype=int)]))
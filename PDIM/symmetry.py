@@ -0,0 +1,121 @@
+"""
+Symmetry groups used by the symmetric minimization method of PDIM.
+
+A group is an array (G, D, D) of signed permutation matrices (the identity
+first). A symmetric set of points is made of the images of n orbit
+representatives under every element of the group, N = n*G points, built
+in a single array operation.
+
+Only the representatives are minimized. Since the energy is invariant
+under the group, E = G/2 * sum over the representatives r of
+sum((d0/|r - p|)**s) over all the other points p, and its gradient with
+respect to r is G times the gradient of these terms. Every evaluation
+takes n*N pairs instead of N*N/2.
+
+Available groups:
+- antipodal: x and -x (order 2)
+- signs: every change of sign of the coordinates (order 2**D)
+- cyclic: cyclic shifts of the coordinates (order D)
+- permutations: every permutation of the coordinates (order D!)
+- hyperoctahedral: signs and permutations (order 2**D * D!)
+
+Author: Antoniel A. S. Gomes (antonielaugusto@gmail.com)
+"""
+
+import math
+import itertools
+import numpy as np
+
+import pairwise
+
+GROUPS = ('antipodal', 'signs', 'cyclic', 'permutations', 'hyperoctahedral')
+
+#Matrices (G, D, D) of a symmetry group in ndim dimensions
+def group(name, ndim):
+    eye = np.eye(ndim)
+    if name == 'antipodal':
+        return np.array([eye, -eye])
+    if name == 'signs':
+        return np.array([np.diag(s) for s in itertools.product((1.0, -1.0), repeat=ndim)])
+    if name == 'cyclic':
+        return np.array([np.roll(eye, k, axis=0) for k in range(ndim)])
+    if name == 'permutations':
+        return np.array([eye[list(p)] for p in itertools.permutations(range(ndim))])
+    if name == 'hyperoctahedral':
+        return np.array([np.diag(s) @ eye[list(p)] for s in itertools.product((1.0, -1.0), repeat=ndim)
+                         for p in itertools.permutations(range(ndim))])
+    raise ValueError('Unrecognized symmetry group: '+str(name))
+
+#Order of a symmetry group in ndim dimensions, without building it
+def order(name, ndim):
+    if name == 'antipodal': return 2
+    if name == 'signs': return 2**ndim
+    if name == 'cyclic': return ndim
+    if name == 'permutations': return math.factorial(ndim)
+    if name == 'hyperoctahedral': return 2**ndim * math.factorial(ndim)
+    raise ValueError('Unrecognized symmetry group: '+str(name))
+
+#All the points of a symmetric set: the images of the representatives under
+#every group element, grouped by element (the first n points are reps)
+def images(reps, group):
+    reps = np.asarray(reps, dtype=float)
+    return np.einsum('gij,nj->gni', group, reps).reshape(-1, reps.shape[1])
+
+#Energy of the symmetric set (sum of (d0/d)**s over all pairs) and its
+#gradient with respect to the representatives
+#The terms are summed relative to the largest one, so log=True returns
+#ln(E) and its gradient without overflow
+def ener_grad(reps, group, d0, s, log=False, block=pairwise.BLOCK):
+    reps = np.asarray(reps, dtype=float)
+    x = images(reps, group)
+    n = len(reps)
+    m, tot = -np.inf, 0.0
+    G = np.zeros_like(reps)
+    for i0 in range(0, n, block):
+        i1 = min(i0 + block, n)
+        a = reps[i0:i1]
+        for j0 in range(0, len(x), block):
+            j1 = min(j0 + block, len(x))
+            b = x[j0:j1]
+            d2 = pairwise.sqdist(a, b)
+            #A representative does not interact with itself (identity image)
+            lo, hi = max(i0, j0), min(i1, j1)
+            if lo < hi: d2[np.arange(lo, hi) - i0, np.arange(lo, hi) - j0] = np.inf
+            t = pairwise.logterms(d2, d0, s)
+            if t.max() == -np.inf: continue
+            #Rescale the sum and the gradient to the largest term found so far
+            if t.max() > m:
+                scale = np.exp(m - t.max())
+                tot, G = tot * scale, G * scale
+                m = t.max()
+            e = np.exp(t - m)
+            w = e / d2
+            tot += np.sum(e)
+            G[i0:i1] -= s * (w.sum(axis=1)[:, None] * a - w @ b)
+    k = len(group)
+    if tot == 0: return (-np.inf if log else 0.0), G
+    if log: return m + np.log(0.5 * k * tot), 2.0 * G / tot
+    return 0.5 * k * np.exp(m) * tot, k * np.exp(m) * G
+
+#Energy of the symmetric set (ln(E) if log)
+def ener(reps, group, d0, s, log=False, block=pairwise.BLOCK):
+    reps = np.asarray(reps, dtype=float)
+    x = images(reps, group)
+    n = len(reps)
+    m, tot = -np.inf, 0.0
+    for i0 in range(0, n, block):
+        i1 = min(i0 + block, n)
+        for j0 in range(0, len(x), block):
+            j1 = min(j0 + block, len(x))
+            d2 = pairwise.sqdist(reps[i0:i1], x[j0:j1])
+            lo, hi = max(i0, j0), min(i1, j1)
+            if lo < hi: d2[np.arange(lo, hi) - i0, np.arange(lo, hi) - j0] = np.inf
+            t = pairwise.logterms(d2, d0, s)
+            if t.max() == -np.inf: continue
+            if t.max() > m:
+                tot *= np.exp(m - t.max())
+                m = t.max()
+            tot += np.sum(np.exp(t - m))
+    if tot == 0: return -np.inf if log else 0.0
+    if log: return m + np.log(0.5 * len(group) * tot)
+    return 0.5 * len(group) * np.exp(m) * tot
@@ -5,7 +5,7 @@ nreps=$(wc -l ./inputs/list-modes.txt | awk '{print $1}')
 
 #generating namd topologies
 mkdir ./mdenm/namd/toppar/
-python ./mdenm/namd/convert_par2namd.py ./toppar.str ./toppar/ ./mdenm/namd/
+python ./scripts/convert_par2namd.py ./toppar.str ./toppar/ ./mdenm/namd/
 
 #generating namd input files
 tr '[:upper:]' '[:lower:]' < inputs/step3.str | sed -e "s/ =//g" | grep -v "set prot" > ./mdenm/namd/step3.str
@@ -23,6 +23,11 @@ echo -e "harmonic {colvars COM\ncenters $(grep xcen step3.str | awk '{print $NF}
 
 echo "Input files generated..."
 
+#excitation velocities of all replicas
+cd ../../
+python ./scripts/mdenm_velocities.py
+cd ./mdenm/namd/
+
 #excitations
 echo "Performing excitations"
 cd ../excitations/
@@ -1,5 +1,9 @@
+import os
 import sys
-import struct
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scripts'))
+import namdbin
 
 """
 Converting Charmm coordinates
@@ -20,17 +24,9 @@ with open(sys.argv[1], 'r') as f: # Reading .crd file
 		if '  EXT' in line:
 			n = 1
 			for line in f:
-				llst=[]
-				llst.append(str(line.split()[4]))
-				llst.append(str(line.split()[5]))
-				llst.append(str(line.split()[6]))
-				if line == '\n': break
+				if line.strip() == '': break
+				llst=line.split()[4:7]
 				coorlst.append(llst)
 				n += 1
 
-with open(sys.argv[2],'wb') as outcoor: # Coordinates output
-	outcoor.write(struct.pack('i',int(len(coorlst)))) # Writing the number of atoms in NAMD binary
-	for i in coorlst:
-		for a in i:
-			outcoor.write(struct.pack('d',float(str(a)))) # Writing coordinates as NAMD binary
-
+namdbin.write(sys.argv[2], np.array(coorlst, dtype=float)) # Writing coordinates as NAMD binary
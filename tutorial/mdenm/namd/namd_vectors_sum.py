@@ -1,5 +1,8 @@
+import os
 import sys
-import struct
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scripts'))
+import namdbin
 
 """
 Summing two each elements in pairs
@@ -13,41 +16,12 @@ Usage: python charmm2namd.py file1.vel file2.vel out.vel
 Antoniel A. S. Gomes, 14/02/2020
 """
 
-def mklst(list):
-	lst=[]
-	with open(list, 'rb') as f: # Reading .crd file
-		file=f.read()
-		natoms = struct.unpack('i', file[0:4])
-		totval=(natoms[0]*3*8)+4
-		init=4
-		end=totval
-		incr=8
-		for atom in range(0,natoms[0]):
-			alst=[]
-			for val in range(0,3):
-				alst.append(struct.unpack('d', file[init:init+incr])[0])
-				init = init+incr
-			lst.append(alst)
-	return lst
-
-def sumlsts(l1,l2):
-	if (len(l1) - len(l2)) != 0:
-		print("\nI can't sum lists with different sizes.")
-		exit()
-	sumlsts=[]
-	for a, b in zip(l1,l2):
-		sumlsts.append([sum(x) for x in zip(a, b)])
-	return sumlsts
-
 #Input files
-lst1=mklst(sys.argv[1])
-lst2=mklst(sys.argv[2])
-
-slst=sumlsts(lst1,lst2)
+v1=namdbin.read(sys.argv[1])
+v2=namdbin.read(sys.argv[2])
 
-with open(sys.argv[3],'wb') as outsum: # Sum output
-	outsum.write(struct.pack('i',int(len(slst)))) # Writing the number of atoms in NAMD binary
-	for i in slst:
-		for a in i:
-			outsum.write(struct.pack('d',float(str(a)))) # Writing sum coordinates as NAMD binary
+if v1.shape != v2.shape:
+	print("\nI can't sum lists with different sizes.")
+	exit()
 
+namdbin.write(sys.argv[3], v1 + v2) # Writing sum coordinates as NAMD binary
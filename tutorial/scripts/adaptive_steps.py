@@ -0,0 +1,80 @@
+import os
+import re
+import sys
+import getopt
+import multiprocessing
+import numpy as np
+
+import crd
+import rmsd
+from dpmdnm_pdb import steps
+
+"""
+Choosing the displacement steps of dpSOL from the VMOD structures
+
+VMOD writes a structure every 0.1 A from 0 to 3 A along each combined
+vector, and each one costs a TMD, an equilibration and a free MD.
+Neighbouring structures often differ very little, so the steps are
+chosen by novelty: starting from the first step (0), the next step is
+the structure with the largest RMSD to all steps chosen so far. The
+choice stops when every structure left is within the tolerance (-t)
+of a chosen one
+
+The chosen steps are written to ./vmod/mode-@REP/steps.txt, which is
+read by the dpmdnm-tmd.sh, dpmdnm-equil.sh and dpmdnm-free-md.sh
+scripts and by scheduler.py (all steps are run without this file)
+
+Usage: python scripts/adaptive_steps.py -t 0.25
+
+-t: RMSD tolerance (A). Default: 0.25
+-a: atom types used for RMSD, comma separated, or all. Default: C,O,N,CA
+-v: directory of the VMOD structures. Default: ./vmod
+-j: number of processes. Default: number of CPUs
+
+Antoniel A. S. Gomes
+"""
+
+def choose(d, tol):
+	# Indices chosen from an RMSD matrix, and the largest RMSD of a structure left to its closest chosen one
+	chosen = [0]
+	novelty = d[0].copy()
+	while novelty.max() > max(tol, 0.0) and len(chosen) < len(d): # Chosen structures have no novelty left
+		chosen.append(int(np.argmax(novelty)))
+		novelty = np.minimum(novelty, d[chosen[-1]])
+	return sorted(chosen), novelty.max()
+
+def mode(args):
+	vmod, rep, tol, types = args
+	found = steps(os.path.join(vmod, 'mode-'+rep, 'conformation_{}.crd'))
+	if not found: return rep, [], 0, 0.0
+	atoms, xyz, weights = crd.read(found[0][1])
+	sele = np.array([types is None or a[2] in types for a in atoms])
+	frames = np.array([crd.coordinates(f)[sele] for dstep, f in found])
+	chosen, left = choose(rmsd.matrix(frames), tol)
+	with open(os.path.join(vmod, 'mode-'+rep, 'steps.txt'), 'w') as f:
+		f.write(''.join(found[i][0]+'\n' for i in chosen))
+	return rep, [found[i][0] for i in chosen], len(found), left
+
+def main(argv):
+	try:
+		opts = dict(getopt.getopt(argv, 't:a:v:j:')[0])
+		tol = float(opts.get('-t', 0.25))
+		if tol <= 0: raise ValueError('the RMSD tolerance (-t) must be positive')
+		types = opts.get('-a', 'C,O,N,CA')
+		types = None if types == 'all' else types.split(',')
+		vmod = opts.get('-v', './vmod')
+		nproc = int(opts.get('-j', multiprocessing.cpu_count()))
+		reps = sorted([d[5:] for d in os.listdir(vmod) if re.match(r'mode-\d+$', d)], key=int)
+	except (getopt.GetoptError, ValueError, OSError) as e:
+		print('Input error:\n'+str(e))
+		sys.exit(2)
+
+	total = 0
+	with multiprocessing.Pool(max(1, min(nproc, len(reps)))) as pool:
+		for rep, chosen, n, left in pool.imap(mode, [(vmod, rep, tol, types) for rep in reps]):
+			total += len(chosen)
+			print('mode-%s: %d of %d steps (largest RMSD left %.3f A): %s' % (rep, len(chosen), n, left, ' '.join(chosen)))
+	print(str(total)+' steps chosen')
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -1,6 +1,11 @@
+import os
 import sys
-import struct
-import re
+import getopt
+import itertools
+import multiprocessing
+import numpy as np
+
+import namdbin
 
 """
 Converting Charmm coordinates and velocities
@@ -12,63 +17,82 @@ A = ',XTLABC(1),XTLABC(2),XTLABC(4)
 B = ',XTLABC(2),XTLABC(3),XTLABC(5)
 C = ',XTLABC(4),XTLABC(5),XTLABC(6)
 
+The restart file is read line by line, and the coordinate (XOLD)
+and velocity (VX) blocks are parsed at once from their fixed-width
+Fortran fields (D22.15), after changing the D exponents to E
+
 Usage: python charmm2namd.py input.rst out.coor out.vel out.xsc
+       python charmm2namd.py [-o outdir] [-j nproc] rep1.rst rep2.rst ...
+
+With several restart files, each one is converted to .coor, .vel
+and .xsc files of the same name (in outdir, default: the directory
+of the .rst file), in parallel (-j, default: number of CPUs)
+
 Antoniel A. S. Gomes, 10/09/2018
 """
 
-with open(sys.argv[1], 'r') as f: # Reading .rst file
-        pbclst = [] # Creating pbc list
-	coorlst = [] # Creating coordinates list
-	vellst = [] # Creating velocities list
-	pbclst.append(str('# NAMD extended system configuration output file\n#$LABELS step a_x a_y a_z b_x b_y b_z c_x c_y c_z o_x o_y o_z s_x s_y s_z s_u s_v s_w'))
-        for line in f:
-		if '!CRYSTAL PARAMETERS' in line:
-			n = 1
-			for line in f:
-				if n == 1:
-					line = re.sub('([D])(...)',r'\1\2 ', line)
-					line = re.sub('D',r'e', line)
-					pbclst.append(str(line.split()[0]))
-					pbclst.append(str(line.split()[1]))
-					pbclst.append(str(line.split()[2]))
-				if n == 2:
-					line = re.sub('([D])(...)',r'\1\2 ', line)
-					line = re.sub('D',r'e', line)
-					pbclst.append(str(line.split()[0]))
-					pbclst.append(str(line.split()[1]))
-					pbclst.append(str(line.split()[2]))
-					break
-				n += 1
-                if '!NATOM,NPRIV,NSTEP,NSAVC,NSAVV,JHSTRT,NDEGF,SEED,NSAVL' in line:
-			pbclst.append(str(next(f).split()[2]))
-		if '!XOLD, YOLD, ZOLD' in line:
-			for line in f:
-				line = re.sub('([D])(...)',r'\1\2 ', line)
-				line = re.sub('D',r'e', line)
-				if line == '\n': break
-				coorlst.append(line.split())
+WIDTH = 22 # Width of the real values of a restart file (D22.15)
+
+def values(lines, nvalues):
+	# Fixed-width fields of some lines as an array of floats
+	text = ''.join(l.rstrip('\n').ljust(nvalues*WIDTH)[:nvalues*WIDTH] for l in lines).replace('D', 'E')
+	return np.frombuffer(text.encode(), dtype='S'+str(WIDTH)).astype(float)
+
+def read(filename):
+	# Coordinates and velocities (natoms, 3), crystal parameters XTLABC and step of a .rst file
+	rst = {}
+	with open(filename, 'r') as f: # Reading .rst file
+		for line in f:
+			if '!NATOM,NPRIV,NSTEP' in line:
+				l = next(f).split()
+				natoms, rst['step'] = int(l[0]), l[2]
+			elif '!CRYSTAL PARAMETERS' in line:
+				rst['xtlabc'] = values(itertools.islice(f, 2), 3)
+			elif '!XOLD, YOLD, ZOLD' in line:
+				rst['coor'] = values(itertools.islice(f, natoms), 3).reshape(-1, 3)
+			elif '!VX, VY, VZ' in line:
+				rst['vel'] = values(itertools.islice(f, natoms), 3).reshape(-1, 3)
+	for key in ('step', 'xtlabc', 'coor', 'vel'):
+		if key not in rst: raise ValueError(filename+' has no '+key+' section')
+	if len(rst['coor']) != natoms or len(rst['vel']) != natoms:
+		raise ValueError(filename+' is truncated')
+	return rst
 
-                if '!VX, VY, VZ' in line:
-                        for line in f:
-                                line = re.sub('([D])(...)',r'\1\2 ', line)
-                                line = re.sub('D',r'e', line)
-                                if line == '\n': break
-                                vellst.append(line.split())
+def convert(files):
+	rstfile, coorfile, velfile, xscfile = files
+	rst = read(rstfile)
+	namdbin.write(coorfile, rst['coor']) # Writing coordinates as NAMD binary
+	namdbin.write(velfile, rst['vel']) # Writing velocities as NAMD binary
+	x = rst['xtlabc']
+	with open(xscfile, 'w') as outpbc: # PBC output
+		outpbc.write('# NAMD extended system configuration output file\n#$LABELS step a_x a_y a_z b_x b_y b_z c_x c_y c_z o_x o_y o_z s_x s_y s_z s_u s_v s_w\n'
+			+ rst['step'] + ' ' + ' '.join(repr(float(x[i])) for i in (0, 1, 3, 1, 2, 4, 3, 4, 5))
+			+ ' 0 0 0 ' + '0 0 0'+ ' 0 0 0')
+	return rstfile
 
-with open(sys.argv[2],'wb') as outcoor: # Coordinates output
-	outcoor.write(struct.pack('i',int(len(coorlst)))) # Writing the number of atoms in NAMD binary
-	for i in coorlst:
-		for a in i:
-			outcoor.write(struct.pack('d',float(str(a)))) # Writing coordinates as NAMD binary
+def main(argv):
+	try:
+		variables, arguments = getopt.getopt(argv, 'o:j:')
+		opts = dict(variables)
+		nproc = int(opts.get('-j', multiprocessing.cpu_count()))
+		if not arguments: raise ValueError('no restart file')
+		if len(arguments) == 4 and not arguments[1].endswith('.rst'):
+			tasks = [tuple(arguments)]
+		else:
+			tasks = []
+			for rst in arguments:
+				name = os.path.join(opts.get('-o', os.path.dirname(rst)), os.path.splitext(os.path.basename(rst))[0])
+				tasks.append((rst, name+'.coor', name+'.vel', name+'.xsc'))
+	except (getopt.GetoptError, ValueError) as e:
+		print('Input error:\n'+str(e))
+		sys.exit(2)
 
-with open(sys.argv[3],'wb') as outvel: # Velocities output
-	outvel.write(struct.pack('i',int(len(vellst)))) # Writing the number of atoms in NAMD binary
-	for i in vellst:
-		for a in i:
-			outvel.write(struct.pack('d',float(str(a)))) # Writing velocities as NAMD binary
+	if len(tasks) == 1:
+		convert(tasks[0])
+		return
+	with multiprocessing.Pool(max(1, min(nproc, len(tasks)))) as pool:
+		for rst in pool.imap_unordered(convert, tasks):
+			print(rst+' converted')
 
-with open(sys.argv[4],'w') as outpbc: # PBC output
-	outpbc.write(str(pbclst[0]) + '\n' + str(pbclst[7]) + ' ' + str(pbclst[1]) + ' ' + str(pbclst[2]) + ' ' + str(pbclst[4])\
-	+ ' ' + str(pbclst[2]) + ' ' + str(pbclst[3]) + ' ' + str(pbclst[5])\
-	+ ' ' + str(pbclst[4]) + ' ' + str(pbclst[5]) + ' ' + str(pbclst[6])\
-	+ ' 0 0 0 ' + '0 0 0'+ ' 0 0 0')
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,75 @@
+import os
+import sys
+import getopt
+import numpy as np
+
+import crd
+import psf
+
+"""
+Combining normal modes with the weights obtained from PDIM
+
+The same combinations of normal-mode-combination.inp, without CHARMM:
+the selected modes are read once as a (nmodes, 3*natoms) matrix, and
+all combinations (rows of weights) are obtained by one matrix product.
+Each combined vector is written as a .crd file (mode-1.crd, ...)
+
+Modes are read from the .crd files of normal-modes-dcd-crd.inp
+(modes/crd/mode-@n.crd). With -m, the vectors are mass-weighted with
+the masses of a PSF file (multiplied by sqrt(mass)). With -n, each
+combined vector is normalized
+
+Usage: python scripts/combine_modes.py -i inputs/input-modes.txt -l inputs/list-modes.txt
+
+-i: mode numbers, one per line. Default: ./inputs/input-modes.txt
+-l: PDIM weights, one combination per row and one column per mode. Default: ./inputs/list-modes.txt
+-d: directory of the mode .crd files. Default: ./modes/crd
+-o: output directory. Default: ./modes/combined-modes/crd
+-m: PSF file, for mass-weighting the vectors
+-n: normalize the combined vectors
+--npy: also write all combined vectors in a single (ncomb, natoms, 3) .npy file
+
+Antoniel A. S. Gomes
+"""
+
+def loadmodes(directory, modes):
+	# Matrix (nmodes, 3*natoms) of the selected modes, and the atoms of the structure
+	matrix = []
+	for m in modes:
+		atoms, xyz, weights = crd.read(os.path.join(directory, 'mode-'+str(m)+'.crd'))
+		if matrix and xyz.size != matrix[0].size:
+			raise ValueError('mode '+str(m)+' has '+str(len(xyz))+' atoms, not '+str(matrix[0].size // 3))
+		matrix.append(xyz.ravel())
+	return np.array(matrix), atoms
+
+def combine(matrix, weights, masses=None, normalize=False):
+	# All combinations at once: (ncomb, nmodes) @ (nmodes, 3*natoms)
+	vectors = weights @ matrix
+	if masses is not None: vectors *= np.repeat(np.sqrt(masses), 3)
+	if normalize: vectors /= np.linalg.norm(vectors, axis=1)[:, None]
+	return vectors
+
+def main(argv):
+	try:
+		opts = dict(getopt.getopt(argv, 'i:l:d:o:m:n', ['npy='])[0])
+		modes = np.loadtxt(opts.get('-i', './inputs/input-modes.txt'), dtype=int, ndmin=1)
+		weights = np.loadtxt(opts.get('-l', './inputs/list-modes.txt'), ndmin=2)
+		if weights.shape[1] != len(modes):
+			raise ValueError('the weights have '+str(weights.shape[1])+' columns for '+str(len(modes))+' modes')
+		matrix, atoms = loadmodes(opts.get('-d', './modes/crd'), modes)
+		masses = psf.masses(psf.read(opts['-m']), atoms) if '-m' in opts else None
+	except (getopt.GetoptError, ValueError, OSError) as e:
+		print('Input error:\n'+str(e))
+		sys.exit(2)
+
+	vectors = combine(matrix, weights, masses, '-n' in opts)
+	output = opts.get('-o', './modes/combined-modes/crd')
+	if not os.path.isdir(output): os.makedirs(output)
+	fmt = crd.template(atoms)
+	for n, v in enumerate(vectors):
+		crd.write(os.path.join(output, 'mode-'+str(n + 1)+'.crd'), v, fmt=fmt, title=['COMBINED NORMAL MODE VECTOR '+str(n + 1)])
+	if '--npy' in opts: np.save(opts['--npy'], vectors.reshape(len(vectors), -1, 3))
+	print(str(len(vectors))+' combinations of modes '+' '.join(str(m) for m in modes)+' written to '+output)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
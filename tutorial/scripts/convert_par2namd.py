@@ -1,77 +1,121 @@
 #!/usr/bin/env python
 
+import os
 import sys
+import json
+import hashlib
+import multiprocessing
 
-def main(argv):
-    charmm_toppar_file = sys.argv[1]
-    charmm_toppar_dir = sys.argv[2]
-    charmm_toppar_out = sys.argv[3]
-    input_file = open(charmm_toppar_file, 'r')
-    prm_num = 0
-    str_num = 0
-
-    # count paramter files
-    for line in input_file:
-        if ( ".prm" in line ) or ( ".str" in line ) :
-            for i in range(len(line.split())):
-                string = line.split()[i]
-                if ".prm" in string:
-                    if "toppar" not in string:
-                        continue
-                    prm_num = prm_num + 1
-                if ".str" in string:
-                    str_num = str_num + 1
-
-    # list parameter files
-    prm_files = [""] * prm_num
-    str_files = [""] * str_num
-    prm_num = 0
-    str_num = 0
-
-    input_file = open(charmm_toppar_file, 'r')
-    for line in input_file:
-        if ( ".prm" in line ) or ( ".str" in line ) :
-            for i in range(len(line.split())):
-                string = line.split()[i]
-                if ".prm" in string:
-                    if "toppar" not in string:
-                        continue
-                    prm_files[prm_num] = string
-                    prm_num = prm_num + 1
-                if ".str" in string:
-                    str_files[str_num] = string
-                    str_num = str_num + 1
-                   
-    # convert parameter files into NAMD readable format    
-    for i in range(prm_num):
-        input_file = open(prm_files[i], 'r')
-        output_file = open(charmm_toppar_out+prm_files[i], 'w')
+"""
+Converting the CHARMM parameter files listed in toppar.str
+to a NAMD readable format
+
+Converted files are written as outdir/<path in toppar.str>.
+A file is converted again only if its content has changed:
+the hash of every converted file is kept in outdir/.par2namd.json
+Files are converted in parallel
+
+Usage: python convert_par2namd.py toppar.str toppardir outdir [nproc]
+"""
+
+CACHE = '.par2namd.json'
+
+# lines commented out in NAMD
+def comment(line):
+    return line.startswith("ATOM") or line.startswith("MASS") or ( "BOM" in line ) or ( "WRN" in line ) or line.startswith("set") or line.startswith("if")
+
+# parameter (.prm) and stream (.str) files listed in toppar.str
+def parfiles(charmm_toppar_file):
+    prm_files = []
+    str_files = []
+    with open(charmm_toppar_file, 'r') as input_file:
         for line in input_file:
-            if line.startswith("ATOM") or line.startswith("MASS") or ( "BOM" in line ) or ( "WRN" in line ) or line.startswith("set") or line.startswith("if"):
+            if ( ".prm" in line ) or ( ".str" in line ) :
+                for string in line.split():
+                    if ".prm" in string and "toppar" in string:
+                        prm_files.append(string)
+                    if ".str" in string:
+                        str_files.append(string)
+    return prm_files, str_files
+
+def convert_prm(lines):
+    return ["!" + line if comment(line) else line for line in lines]
+
+def convert_str(lines):
+    output = []
+    flag4par = 0
+    flag4nbfix = 0
+    for line in lines:
+        if ( "read para" in line ):
+            flag4par = 1
+            continue
+        if ( flag4par == 1 ):
+            if comment(line):
                 line = "!" + line
-            output_file.write(line)
+            if ( "NBFix between carboxylate and sodium" in line ):
+                flag4nbfix = 1
+                continue
+            if ( flag4nbfix == 1 ) and ( "*" in line ):
+                flag4nbfix = 0
+                continue
+            output.append(line)
+    return output
 
-    for i in range(str_num):
-        input_file = open(str_files[i], 'r')
-        output_file = open(charmm_toppar_out+str_files[i], 'w')
-        flag4par = 0
-        flag4nbfix = 0
-        for line in input_file:
-            if ( "read para" in line):                
-                flag4par = 1
-            if ( flag4par == 1 ):
-                if ( "read para" in line ):
-                    continue
-                if line.startswith("ATOM") or line.startswith("MASS") or ( "BOM" in line ) or ( "WRN" in line ) or line.startswith("set") or line.startswith("if"):
-                   line = "!" + line
-                if ( "NBFix between carboxylate and sodium" in line ):
-                    flag4nbfix = 1
-                    continue
-                if ( flag4nbfix == 1 ) and ( "*" in line ):
-                    flag4nbfix = 0
-                    continue
-
-                output_file.write(line)                
+def digest(filename, kind):
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(kind.encode() + f.read()).hexdigest()
+
+# convert a file if its hash is not the cached one. Returns (file, hash, converted)
+def convert(task):
+    filename, kind, output, cached = task
+    h = digest(filename, kind)
+    if h == cached and os.path.exists(output):
+        return filename, h, False
+    with open(filename, 'r') as input_file:
+        lines = input_file.readlines()
+    lines = convert_prm(lines) if kind == 'prm' else convert_str(lines)
+    outdir = os.path.dirname(output)
+    if outdir and not os.path.isdir(outdir):
+        os.makedirs(outdir)
+    with open(output, 'w') as output_file:
+        output_file.writelines(lines)
+    return filename, h, True
+
+def main(argv):
+    charmm_toppar_file = argv[0]
+    charmm_toppar_dir = argv[1]
+    charmm_toppar_out = argv[2]
+    nproc = int(argv[3]) if len(argv) > 3 else multiprocessing.cpu_count()
+
+    cachefile = os.path.join(charmm_toppar_out, CACHE)
+    try:
+        with open(cachefile, 'r') as f:
+            cache = json.load(f)
+    except (IOError, ValueError):
+        cache = {}
+
+    prm_files, str_files = parfiles(charmm_toppar_file)
+    tasks = []
+    for kind, names in (('prm', prm_files), ('str', str_files)):
+        for name in names:
+            output = charmm_toppar_out + name
+            if output not in [t[2] for t in tasks]:
+                tasks.append((name, kind, output, cache.get(output)))
+    if not tasks:
+        return
+
+    # convert parameter files into NAMD readable format
+    pool = multiprocessing.Pool(max(1, min(nproc, len(tasks))))
+    try:
+        results = pool.map(convert, tasks)
+    finally:
+        pool.close()
+    for (name, kind, output, cached), (filename, h, converted) in zip(tasks, results):
+        cache[output] = h
+    with open(cachefile, 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    nconv = sum(converted for filename, h, converted in results)
+    print(str(nconv) + " parameter files converted, " + str(len(results) - nconv) + " unchanged")
 
 if __name__ == "__main__":
    main(sys.argv[1:])
@@ -0,0 +1,70 @@
+import numpy as np
+
+"""
+Reading and writing CHARMM coordinate files (.crd)
+
+Both formats are read: standard (I5 atom numbers) and
+extended (EXT, I10 atom numbers). Files are written in the
+extended format, as CHARMM does for the tutorial systems
+
+Each atom is kept as (resno, resname, type, segid, resid),
+so a file can be written back with other coordinates,
+e.g. a normal mode vector of the same structure
+
+Usage (as a module):
+import crd
+atoms, xyz, weights = crd.read('modes/crd/mode-7.crd')
+xyz = crd.coordinates('modes/crd/mode-8.crd')
+crd.write('out.crd', 2.0*xyz, atoms, weights, title=['DOUBLED MODE 7'])
+
+Antoniel A. S. Gomes
+"""
+
+def read(filename):
+	atoms = [] # (resno, resname, type, segid, resid)
+	values = [] # x, y, z and weight
+	with open(filename, 'r') as f:
+		for line in f:
+			if not line.startswith('*'): break # Title lines
+		natoms = int(line.split()[0]) # Number of atoms (with EXT or not)
+		for line in f:
+			if line.strip() == '': break
+			l = line.split()
+			atoms.append((l[1], l[2], l[3], l[7], l[8]))
+			values.append(l[4:7] + l[9:10])
+	if len(atoms) != natoms:
+		raise ValueError(filename+' has '+str(len(atoms))+' atoms, not '+str(natoms))
+	values = np.array(values, dtype=float).reshape(natoms, -1)
+	weights = values[:, 3] if values.shape[1] > 3 else np.zeros(natoms)
+	return atoms, values[:, :3], weights
+
+def coordinates(filename):
+	# Only the coordinates, from their fixed columns: faster than read() for many files of the same structure
+	with open(filename, 'r') as f:
+		lines = f.read().splitlines()
+	n = 0
+	while lines[n].startswith('*'): n += 1 # Title lines
+	natoms = int(lines[n].split()[0])
+	c = 40 if 'EXT' in lines[n] else 20 # Columns of X in the extended and standard formats
+	w = 20 if 'EXT' in lines[n] else 10
+	lines = lines[n + 1:n + 1 + natoms]
+	if len(lines) != natoms:
+		raise ValueError(filename+' has '+str(len(lines))+' atoms, not '+str(natoms))
+	return np.array([(l[c:c + w], l[c + w:c + 2*w], l[c + 2*w:c + 3*w]) for l in lines], dtype=float)
+
+def template(atoms, weights=None):
+	# One format string for the whole atom section: a file is then written with a single % operation
+	if weights is None: weights = np.zeros(len(atoms))
+	lines = []
+	for n, (atom, w) in enumerate(zip(atoms, weights)):
+		resno, resname, type, segid, resid = atom
+		lines.append(('%10d%10s  %-8s  %-8s' % (n + 1, resno, resname, type)).replace('%', '%%') + '%20.10f%20.10f%20.10f'
+			+ ('  %-8s  %-8s%20.10f\n' % (segid, resid, w)).replace('%', '%%'))
+	return '%10d  EXT\n' % len(atoms) + ''.join(lines)
+
+def write(filename, xyz, atoms=None, weights=None, title=(), fmt=None):
+	# fmt: template of the atoms, to write many files of the same structure
+	if fmt is None: fmt = template(atoms, weights)
+	xyz = np.asarray(xyz, dtype=float)
+	with open(filename, 'w') as f:
+		f.write(''.join('* '+t+'\n' for t in title) + '*\n' + fmt % tuple(xyz.ravel()))
@@ -0,0 +1,63 @@
+import os
+import numpy as np
+
+"""
+Reading CHARMM/NAMD trajectories (.dcd) as memory-mapped arrays
+
+A DCD file is a header followed by frames of Fortran records:
+the unit cell (6 doubles, if any), then the X, Y and Z values of
+all atoms (float32). The frames are mapped as a structured array,
+so a frame is only read from disk when its coordinates are used,
+and files of any size can be analysed by chunks of frames.
+The number of frames is taken from the file size, so trajectories
+still being written can be read. Both byte orders are read
+
+Usage (as a module):
+import dcd
+traj = dcd.read('free-md_1_0.dcd')
+print(traj['natoms'], traj['nframes'])
+xyz = dcd.coordinates(traj, 0, 100, sele) # (100, len(sele), 3) array
+
+Antoniel A. S. Gomes
+"""
+
+def header(filename):
+	with open(filename, 'rb') as f:
+		data = f.read(92)
+		order = '<' if np.frombuffer(data[:4], '<i4')[0] == 84 else '>'
+		if np.frombuffer(data[:4], order+'i4')[0] != 84 or data[4:8] != b'CORD':
+			raise ValueError(filename+' is not a DCD file')
+		icntrl = np.frombuffer(data[8:88], order+'i4')
+		if icntrl[8] > 0: raise ValueError(filename+' has fixed atoms, which are not supported')
+		size = np.frombuffer(f.read(4), order+'i4')[0] # Title record
+		title = f.read(size)
+		f.read(4)
+		f.read(4)
+		natoms = int(np.frombuffer(f.read(4), order+'i4')[0])
+		f.read(4)
+		offset = f.tell()
+	cell = bool(icntrl[10]) and icntrl[19] != 0 # Unit cell of CHARMM formatted files
+	fields = []
+	if cell: fields += [('cellhead', order+'i4'), ('cell', order+'f8', 6), ('celltail', order+'i4')]
+	for c in ('x', 'y', 'z', 'w')[:4 if icntrl[11] else 3]:
+		fields += [(c+'head', order+'i4'), (c, order+'f4', natoms), (c+'tail', order+'i4')]
+	dtype = np.dtype(fields)
+	title = [title[4 + 80*i:4 + 80*(i + 1)].decode('ascii', 'replace').rstrip() for i in range((len(title) - 4) // 80)]
+	return {'natoms': natoms, 'nframes': (os.path.getsize(filename) - offset) // dtype.itemsize, 'istart': int(icntrl[1]),
+		'nsavc': int(icntrl[2]), 'delta': float(np.frombuffer(data[44:48], order+'f4')[0]), 'cell': cell,
+		'title': title, 'offset': offset, 'dtype': dtype}
+
+def read(filename):
+	# Header as a dictionary, with the frames mapped in 'frames'
+	traj = header(filename)
+	if traj['nframes'] == 0:
+		traj['frames'] = np.zeros(0, dtype=traj['dtype'])
+	else:
+		traj['frames'] = np.memmap(filename, dtype=traj['dtype'], mode='r', offset=traj['offset'], shape=(traj['nframes'],))
+	return traj
+
+def coordinates(traj, start=0, stop=None, sele=None):
+	# Coordinates (nframes, natoms, 3) of the frames start to stop, of the selected atoms
+	frames = traj['frames'][start:stop]
+	if sele is None: sele = slice(None)
+	return np.stack([frames['x'][:, sele], frames['y'][:, sele], frames['z'][:, sele]], axis=-1).astype(float)
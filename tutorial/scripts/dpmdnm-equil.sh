@@ -5,12 +5,15 @@ echo "Performing equilibration"
 nreps=$(wc -l inputs/list-modes.txt | awk '{print $1}')
 for rep in $(seq 1 $nreps); do
 	export rep=$rep
+	steps="0 0.1 0.2 0.3 0.4 0.5 0.6 0.7 0.8 0.9 1 1.1 1.2 1.3 1.4 1.5 1.6 1.7 1.8 1.9 2 2.1 2.2 2.3 2.4 2.5 2.6 2.7 2.8 2.9 3"
+	#steps chosen by adaptive_steps.py
+	if [ -f ./vmod/mode-${rep}/steps.txt ]; then steps=$(cat ./vmod/mode-${rep}/steps.txt); fi
 	echo "mode-${rep}..."
 	mkdir ./dpmdnm/mode-${rep}/equil/
 	cd    ./dpmdnm/mode-${rep}/equil/
 	scp ../../../scripts/dpmdnm-equil.inp ./dpmdnm-equil.inp
 
-	for dstep in 0 0.1 0.2 0.3 0.4 0.5 0.6 0.7 0.8 0.9 1 1.1 1.2 1.3 1.4 1.5 1.6 1.7 1.8 1.9 2 2.1 2.2 2.3 2.4 2.5 2.6 2.7 2.8 2.9 3; do
+	for dstep in $steps; do
 		export dstep=$dstep
 		echo "step ${dstep} submitted"
 		/usr/local/namd2/namd2 +p 2 dpmdnm-equil.inp > equil_${rep}_${dstep}.out
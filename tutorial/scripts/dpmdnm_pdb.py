@@ -0,0 +1,98 @@
+import os
+import re
+import sys
+import glob
+import getopt
+import multiprocessing
+
+import crd
+import pdbfile
+import namdbin
+
+"""
+Writing the TMD targets and the positional restraints of dpSOL as PDB files
+
+The same files of dpmdnm-target.inp and dpmdnm-restraints.inp, without
+starting CHARMM for each structure. The atoms of a structure are read
+once and rendered as a template, then only the coordinates of each
+file are read and written. Mode directories are processed in parallel
+
+targets: ./vmod/mode-@REP/conformation_@DSTEP.crd
+         -> ./dpmdnm/mode-@REP/target_@DSTEP.pdb
+restraints: ./dpmdnm/mode-@REP/tmd/tmd_@REP_@DSTEP.coor
+         -> ./dpmdnm/mode-@REP/restraints_@DSTEP.pdb
+         (B-factor 1.0 for the protein, 0.0 for the other atoms)
+
+Usage: python scripts/dpmdnm_pdb.py targets
+       python scripts/dpmdnm_pdb.py restraints -p ./inputs/step6.pdb -s A
+
+-v: directory of the VMOD structures. Default: ./vmod
+-o: dpmdnm directory. Default: ./dpmdnm
+-p: PDB file of the whole system, used as template for the restraints. Default: ./inputs/step6.pdb
+-s: protein segments (PROT in step3.str), comma separated. Default: A
+-j: number of processes. Default: number of CPUs
+
+Antoniel A. S. Gomes
+"""
+
+def steps(pattern):
+	# Files of a pattern with a {} for the step, sorted by the step value, as (step, file)
+	files = glob.glob(pattern.replace('{}', '*'))
+	regex = re.compile(re.escape(pattern).replace(re.escape('{}'), '([0-9.]+)')+'$')
+	found = [(m.group(1), f) for f in files for m in [regex.match(f)] if m]
+	return sorted(found, key=lambda s: float(s[0]))
+
+def targets(args):
+	vmod, output, rep = args
+	found = steps(os.path.join(vmod, 'mode-'+rep, 'conformation_{}.crd'))
+	if not found: return rep, 0
+	atoms, xyz, weights = crd.read(found[0][1])
+	fmt = pdbfile.template(pdbfile.crdrecords(atoms), 1.0, 1.0)
+	os.makedirs(os.path.join(output, 'mode-'+rep), exist_ok=True)
+	for dstep, f in found:
+		pdbfile.write(os.path.join(output, 'mode-'+rep, 'target_'+dstep+'.pdb'), crd.coordinates(f), fmt,
+			['VMOD Target', 'Replica = '+rep, 'DSTEP = '+dstep])
+	return rep, len(found)
+
+def restraints(args):
+	output, rep, fmt, natoms = args
+	found = steps(os.path.join(output, 'mode-'+rep, 'tmd', 'tmd_'+rep+'_{}.coor'))
+	for dstep, f in found:
+		xyz = namdbin.read(f)
+		if len(xyz) != natoms:
+			raise ValueError(f+' has '+str(len(xyz))+' atoms, the template has '+str(natoms))
+		pdbfile.write(os.path.join(output, 'mode-'+rep, 'restraints_'+dstep+'.pdb'), xyz, fmt,
+			['Structure generated by VMOD', 'Saved to be used for an equilibration step with constraints', 'Replica = '+rep, 'DSTEP = '+dstep])
+	return rep, len(found)
+
+def main(argv):
+	try:
+		variables, arguments = getopt.gnu_getopt(argv, 'v:o:p:s:j:')
+		opts = dict(variables)
+		if len(arguments) != 1 or arguments[0] not in ('targets', 'restraints'):
+			raise ValueError('choose targets or restraints')
+		output = opts.get('-o', './dpmdnm')
+		nproc = int(opts.get('-j', multiprocessing.cpu_count()))
+		if arguments[0] == 'targets':
+			vmod = opts.get('-v', './vmod')
+			reps = sorted([d[5:] for d in os.listdir(vmod) if re.match(r'mode-\d+$', d)], key=int)
+			tasks = [(vmod, output, rep) for rep in reps]
+			function = targets
+		else:
+			lines = pdbfile.records(opts.get('-p', './inputs/step6.pdb'))
+			segids = opts.get('-s', 'A').split(',')
+			beta = [1.0 if l[72:76].strip() in segids else 0.0 for l in lines]
+			fmt = pdbfile.template(lines, 1.0, beta)
+			reps = sorted([d[5:] for d in os.listdir(output) if re.match(r'mode-\d+$', d)], key=int)
+			tasks = [(output, rep, fmt, len(lines)) for rep in reps]
+			function = restraints
+	except (getopt.GetoptError, ValueError, OSError) as e:
+		print('Input error:\n'+str(e))
+		sys.exit(2)
+
+	with multiprocessing.Pool(max(1, min(nproc, len(tasks)))) as pool:
+		for rep, n in pool.imap(function, tasks):
+			print('mode-'+rep+': '+str(n)+' '+arguments[0])
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,118 @@
+import os
+import sys
+import getopt
+import numpy as np
+
+import crd
+import psf
+import namdbin
+
+"""
+Excitation velocities of all MDeNM replicas in a single run
+
+The masses (step1.psf) and the combined vectors of all replicas are
+read once. As in mdenm-combined-modes.inp, each vector is mass-unweighted
+(multiplied by the square root of the masses) and zeroed outside the
+protein, then scaled so that its kinetic energy corresponds to the input
+temperature of input-mdenm.txt:
+
+	T(Q) = sum(m*Q^2) / (Ndof*kB), fscale = sqrt(Tinput/T(Q))
+
+with Ndof the degrees of freedom of the system (3N, minus the SHAKE
+constraints of the bonds with hydrogens and the 3 of the center of mass).
+All replicas are scaled at once, and the velocities are written as NAMD
+binaries (velocities in AKMA units, as the CHARMM velocities):
+
+./mdenm/excitations/@REP/vectormodes.vel       excitation velocities
+./mdenm/excitations/@REP/vector-rep@REP-e1.vel  step6.vel + excitation
+
+The input velocities of the next excitations need the final velocities
+of the previous one (rep-@REP-e@EXC.vel, written by NAMD): they are
+written for every excitation whose previous one is finished, so running
+this script again between excitations writes all of them at once.
+namd-exc.inp only builds the files that are missing or out of date.
+
+Usage: python scripts/mdenm_velocities.py [options]
+
+-i: MDeNM input (temperature, number of excitations). Default: ./mdenm/input-mdenm.txt
+-m: PSF file of the protein (masses). Default: ./inputs/step1.psf
+-s: PSF file of the system. Default: ./inputs/step3.psf
+-v: velocities of the system. Default: ./inputs/step6.vel
+-l: PDIM weights, one replica per line. Default: ./inputs/list-modes.txt
+-d: directory of the combined vectors (mode-@REP.crd). Default: ./modes/combined-modes/crd
+-o: directory of the replicas. Default: ./mdenm/excitations
+--ndegf: degrees of freedom of the system, when the system PSF is not available
+         (the protein atoms are then the first atoms of the system)
+
+Antoniel A. S. Gomes
+"""
+
+KBOLTZ = 1.987191e-3 # Boltzmann constant of CHARMM (kcal/mol/K)
+
+def parameters(filename):
+	# Input temperature and number of excitations (first value of the first lines)
+	with open(filename, 'r') as f:
+		values = [line.split()[0] for line in f if line.strip()]
+	return float(values[0]), int(values[1])
+
+def degrees(atoms, pairs):
+	# Degrees of freedom of the system: SHAKE on the bonds with hydrogens, center of mass fixed
+	light = atoms['mass'] < 3.5
+	return 3*len(atoms['mass']) - int(np.count_nonzero(light[pairs].any(axis=1))) - 3
+
+def excitation(q, mass, tempuser, ndegf):
+	# Vectors (nreps, natoms, 3) scaled to the input temperature, and their temperatures before scaling
+	temp = np.einsum('n,rni,rni->r', mass, q, q) / (ndegf*KBOLTZ)
+	return q * np.sqrt(tempuser/temp)[:, None, None], temp
+
+def main(argv):
+	try:
+		opts = dict(getopt.getopt(argv, 'i:m:s:v:l:d:o:', ['ndegf='])[0])
+		tempuser, nexc = parameters(opts.get('-i', './mdenm/input-mdenm.txt'))
+		nreps = len(np.loadtxt(opts.get('-l', './inputs/list-modes.txt'), ndmin=2))
+		files = [os.path.join(opts.get('-d', './modes/combined-modes/crd'), 'mode-'+str(r)+'.crd') for r in range(1, nreps + 1)]
+		atoms, xyz, weights = crd.read(files[0])
+		q = np.array([crd.coordinates(f) for f in files])
+		if q.shape[1:] != xyz.shape: raise ValueError('the combined vectors have different numbers of atoms')
+		mass = psf.masses(psf.read(opts.get('-m', './inputs/step1.psf')), atoms)
+		vel = namdbin.read(opts.get('-v', './inputs/step6.vel'))
+		if '--ndegf' in opts:
+			ndegf, sele = int(opts['--ndegf']), np.arange(len(atoms))
+		else:
+			system = psf.read(opts.get('-s', './inputs/step3.psf'))
+			if len(system['mass']) != len(vel):
+				raise ValueError('the system PSF has '+str(len(system['mass']))+' atoms, the velocities '+str(len(vel)))
+			ndegf, sele = degrees(system, psf.bonds(opts.get('-s', './inputs/step3.psf'))), psf.index(system, atoms)
+	except (getopt.GetoptError, ValueError, IndexError, OSError) as e:
+		print('Input error:\n'+str(e))
+		sys.exit(2)
+
+	q *= np.sqrt(mass)[None, :, None] # Mass-unweighting
+	norm = np.sqrt(np.sum(q*q, axis=(1, 2)))
+	if np.any(np.abs(norm - 1.0) > 1e-3): # As the check of mdenm-combined-modes.inp
+		print('Input error:\nthe combined vectors are not normalized: '+' '.join('%.6f' % n for n in norm))
+		sys.exit(2)
+	q, temp = excitation(q, mass, tempuser, ndegf)
+
+	print('Input temperature: %g K, %d degrees of freedom\n' % (tempuser, ndegf))
+	print('Replica  T(Q) (K)      fscale     Excitations')
+	outdir = opts.get('-o', './mdenm/excitations')
+	for r in range(nreps):
+		rep = str(r + 1)
+		os.makedirs(os.path.join(outdir, rep), exist_ok=True)
+		v = np.zeros(vel.shape)
+		v[sele] = q[r]
+		namdbin.write(os.path.join(outdir, rep, 'vectormodes.vel'), v)
+		namdbin.write(os.path.join(outdir, rep, 'vector-rep'+rep+'-e1.vel'), vel + v)
+		done = [1]
+		for exc in range(2, nexc + 1):
+			previous = os.path.join(outdir, rep, 'rep-'+rep+'-e'+str(exc - 1)+'.vel')
+			out = os.path.join(outdir, rep, 'vector-rep'+rep+'-e'+str(exc)+'.vel')
+			if not os.path.exists(previous): break
+			if not os.path.exists(out) or os.path.getmtime(previous) > os.path.getmtime(out):
+				namdbin.write(out, namdbin.read(previous) + v)
+			done.append(exc)
+		print('%-8s %-13.6g %-10.6g %s' % (rep, temp[r], np.sqrt(tempuser/temp[r]), ' '.join(str(e) for e in done)))
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,52 @@
+import os
+import sys
+import numpy as np
+
+"""
+Reading and writing NAMD binary files (.coor, .vel)
+
+A NAMD binary file has the number of atoms (4-byte integer)
+followed by the X, Y and Z values of each atom (8-byte doubles)
+
+The files are read as memory-mapped (natoms, 3) float64 arrays,
+so nothing is loaded until it is used, and written with a single
+buffer write. Files with the other byte order are also read
+
+Usage (as a module):
+import namdbin
+xyz = namdbin.read('step6.vel')
+namdbin.write('out.vel', 2.0*xyz)
+
+Usage (summary of a file): python namdbin.py file.vel
+Antoniel A. S. Gomes
+"""
+
+def natoms(filename):
+	size = os.path.getsize(filename)
+	for order in ('<', '>'): # Native files first, then the other byte order
+		n = int(np.fromfile(filename, dtype=order+'i4', count=1)[0]) if size >= 4 else -1
+		if n >= 0 and size == 4 + 24*n: return n, order
+	raise ValueError(filename+' is not a NAMD binary file')
+
+def read(filename, mode='r'):
+	n, order = natoms(filename)
+	if n == 0: return np.zeros((0, 3))
+	return np.memmap(filename, dtype=order+'f8', mode=mode, offset=4, shape=(n, 3))
+
+def write(filename, xyz):
+	xyz = np.ascontiguousarray(xyz, dtype='<f8')
+	if xyz.ndim != 2 or xyz.shape[1] != 3:
+		raise ValueError('NAMD binary values must be (natoms, 3), not '+str(xyz.shape))
+	with open(filename, 'wb') as f:
+		f.write(np.array([len(xyz)], dtype='<i4').tobytes() + xyz.tobytes()) # Header and values in a single write
+
+if __name__ == '__main__':
+	if len(sys.argv) < 2:
+		print('Usage: python namdbin.py file.vel')
+		sys.exit()
+	xyz = read(sys.argv[1])
+	print('Atoms: '+str(len(xyz)))
+	if len(xyz):
+		print('Min:   '+' '.join('%.6f' % v for v in xyz.min(axis=0)))
+		print('Max:   '+' '.join('%.6f' % v for v in xyz.max(axis=0)))
+		print('Norm:  %.6f' % np.linalg.norm(xyz))
@@ -0,0 +1,127 @@
+import os
+import sys
+import glob
+import getopt
+import multiprocessing
+import numpy as np
+
+import crd
+import psf
+import dcd
+import rmsd
+
+"""
+Coverage of the normal-mode space by the dpMDNM trajectories
+
+Every frame of the trajectories is fitted on the reference structure
+and its displacement is projected onto the selected normal modes
+(mass-weighted). The direction of the projection is a point of the
+hypersphere sampled by PDIM: each frame is assigned to the closest
+combined vector (row of weights), and its amplitude (mass-weighted
+RMS displacement along the modes, in A) is histogrammed.
+
+Trajectories are read as memory-mapped files by chunks of frames,
+so their size is not limited by memory, and are analysed in parallel.
+Histograms are accumulated over all frames
+
+Usage: python scripts/nm_coverage.py [options] [trajectories.dcd ...]
+
+Trajectories: Default: ./dpmdnm/mode-*/free-md/*.dcd
+-p: PSF file of the trajectories. Default: ./inputs/step3.psf
+-r: reference structure (.crd) of the modes. Default: ./modes/minimized-angstrom.crd
+-i: mode numbers, one per line. Default: ./inputs/input-modes.txt
+-l: PDIM weights (combined vectors). Default: ./inputs/list-modes.txt
+-d: directory of the mode .crd files. Default: ./modes/crd
+-b: number of amplitude bins. Default: 30
+-a: largest amplitude (A). Default: 3
+-c: frames read at once. Default: 1000
+-j: number of processes. Default: number of CPUs
+-o: write the histograms and the projections of every frame to this file (.npz)
+
+Antoniel A. S. Gomes
+"""
+
+def setup(opts):
+	# Everything the workers need: atoms of the modes in the trajectories,
+	# reference, mass-weighted unit modes and combined vectors
+	atoms, ref, weights = crd.read(opts.get('-r', './modes/minimized-angstrom.crd'))
+	modes = np.loadtxt(opts.get('-i', './inputs/input-modes.txt'), dtype=int, ndmin=1)
+	vectors = np.loadtxt(opts.get('-l', './inputs/list-modes.txt'), ndmin=2)
+	if vectors.shape[1] != len(modes):
+		raise ValueError('the weights have '+str(vectors.shape[1])+' columns for '+str(len(modes))+' modes')
+	psfatoms = psf.read(opts.get('-p', './inputs/step3.psf'))
+	sele = psf.index(psfatoms, atoms)
+	sqm = np.sqrt(psfatoms['mass'][sele])[:, None]
+	basis = []
+	for m in modes:
+		v = crd.coordinates(os.path.join(opts.get('-d', './modes/crd'), 'mode-'+str(m)+'.crd'))
+		if len(v) != len(ref): raise ValueError('mode '+str(m)+' has '+str(len(v))+' atoms, not '+str(len(ref)))
+		v = (sqm * v).ravel()
+		basis.append(v / np.linalg.norm(v))
+	return {'natoms': len(psfatoms['mass']), 'sele': sele, 'ref': ref, 'sqm': sqm, 'mtot': np.sum(sqm**2),
+		'basis': np.array(basis), 'vectors': vectors / np.linalg.norm(vectors, axis=1)[:, None],
+		'edges': np.linspace(0.0, float(opts.get('-a', 3.0)), int(opts.get('-b', 30)) + 1), 'chunk': int(opts.get('-c', 1000))}
+
+def project(xyz, s):
+	# Mass-weighted projections (nframes, nmodes) of frames of the selected atoms
+	fit = rmsd.superpose(xyz, s['ref'])
+	dx = (s['sqm'] * (fit - s['ref'])).reshape(len(fit), -1)
+	return dx @ s['basis'].T
+
+def analyse(args):
+	# Histogram (nvectors, nbins), sum and largest amplitude of each vector, and the projections if keep
+	filename, s, keep = args
+	traj = dcd.read(filename)
+	if traj['natoms'] != s['natoms']:
+		raise ValueError(filename+' has '+str(traj['natoms'])+' atoms, the PSF file has '+str(s['natoms']))
+	nvec, nbins = len(s['vectors']), len(s['edges']) - 1
+	counts, total, largest = np.zeros((nvec, nbins), dtype=int), np.zeros(nvec), np.zeros(nvec)
+	q = []
+	for start in range(0, traj['nframes'], s['chunk']):
+		p = project(dcd.coordinates(traj, start, start + s['chunk'], s['sele']), s)
+		amplitude = np.linalg.norm(p, axis=1) / np.sqrt(s['mtot'])
+		closest = np.argmax(p @ s['vectors'].T, axis=1) # Closest combined vector (largest cosine)
+		bins = np.clip(np.searchsorted(s['edges'], amplitude, side='right') - 1, 0, nbins - 1)
+		np.add.at(counts, (closest, bins), 1)
+		np.add.at(total, closest, amplitude)
+		np.maximum.at(largest, closest, amplitude)
+		if keep: q.append(p)
+	q = np.concatenate(q) if q else np.zeros((0, len(s['basis'])))
+	return filename, counts, total, largest, q
+
+def main(argv):
+	try:
+		variables, files = getopt.getopt(argv, 'p:r:i:l:d:b:a:c:j:o:')
+		opts = dict(variables)
+		if not files: files = sorted(glob.glob('./dpmdnm/mode-*/free-md/*.dcd'))
+		if not files: raise ValueError('no trajectory found')
+		nproc = int(opts.get('-j', multiprocessing.cpu_count()))
+		s = setup(opts)
+	except (getopt.GetoptError, ValueError, OSError) as e:
+		print('Input error:\n'+str(e))
+		sys.exit(2)
+
+	nvec = len(s['vectors'])
+	counts, total, largest = np.zeros((nvec, len(s['edges']) - 1), dtype=int), np.zeros(nvec), np.zeros(nvec)
+	projections = {}
+	with multiprocessing.Pool(max(1, min(nproc, len(files)))) as pool:
+		for filename, c, t, l, q in pool.imap_unordered(analyse, [(f, s, '-o' in opts) for f in files]):
+			counts += c
+			total += t
+			largest = np.maximum(largest, l)
+			projections[filename] = q
+			print('%s: %d frames' % (filename, c.sum()))
+
+	frames = counts.sum(axis=1)
+	print('\n'+str(frames.sum())+' frames of '+str(len(files))+' trajectories\n')
+	print('Vector  Frames     Mean (A)  Max (A)   Amplitudes (0 to %g A)' % s['edges'][-1])
+	for n in range(nvec):
+		bar = ''.join(' .:-=+*#%@'[int(np.ceil(9.0 * c / counts.max()))] if counts.max() else ' ' for c in counts[n])
+		print('%-7d %-10d %-9.3f %-9.3f |%s|' % (n + 1, frames[n], total[n] / frames[n] if frames[n] else 0.0, largest[n], bar))
+	print('\nVectors visited: %d of %d' % (np.count_nonzero(frames), nvec))
+	if '-o' in opts:
+		np.savez(opts['-o'], counts=counts, edges=s['edges'], vectors=s['vectors'], files=np.array(files),
+			**{'q%d' % n: projections[f] for n, f in enumerate(files)})
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
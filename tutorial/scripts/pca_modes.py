@@ -0,0 +1,131 @@
+import os
+import sys
+import glob
+import getopt
+import numpy as np
+
+import crd
+import psf
+import dcd
+import rmsd
+
+"""
+Principal components of trajectories, as vectors for PDIM
+
+dpMDNM can use principal components (PCs) in place of normal modes.
+The frames of the trajectories are read by chunks (memory-mapped, see
+dcd.py), fitted on the reference structure and added to an incremental
+SVD of the centered coordinates (Ross et al., 2008): the mean and the
+leading singular vectors are updated with each chunk, so neither the
+frames nor the 3Nx3N covariance matrix are ever held in memory, and
+the cost of a chunk grows with the number of atoms, not its square.
+More components than requested are kept during the updates (-k)
+
+The PCs are written as the normal modes of normal-modes-dcd-crd.inp,
+so they are combined by combine_modes.py (or normal-mode-combination.inp)
+with the weights of PDIM:
+
+./modes/pca/crd/mode-@N.crd  PC N (unit vector, the largest variance first)
+./modes/pca/pca-modes.txt    PC numbers, one per line (combine_modes.py -i)
+./modes/pca/pca.txt          variance of each PC and fraction of the total
+
+With -w, the PCA is mass-weighted, as the normal modes (coordinates
+multiplied by the square root of the masses)
+
+Usage: python scripts/pca_modes.py [options] [trajectories.dcd ...]
+
+Trajectories: Default: ./dpmdnm/mode-*/free-md/*.dcd
+-p: PSF file of the trajectories. Default: ./inputs/step3.psf
+-r: reference structure (.crd), atoms of the PCs. Default: ./modes/minimized-angstrom.crd
+-a: atom types fitted on the reference, comma separated, or all. Default: C,O,N,CA
+-n: number of PCs. Default: 14
+-k: number of PCs kept during the updates. Default: twice the number of PCs
+-c: frames read at once. Default: 500
+-s: stride (every s-th frame). Default: 1
+-w: mass-weighted PCA
+-o: output directory. Default: ./modes/pca
+
+Antoniel A. S. Gomes
+"""
+
+def update(pca, x, keep):
+	# Adds the frames x (nframes, ndim) to the decomposition: the singular vectors of
+	# [S*V; x - mean(x); correction of the mean] are those of all frames seen so far.
+	# They are obtained from the small Gram matrix of these rows
+	n, b = pca['n'], len(x)
+	mean = x.mean(axis=0)
+	m = x - mean
+	pca['ss'] += np.sum(m**2) # Total sum of squares, for the fractions of variance
+	if n:
+		shift = np.sqrt(n*b/(n + b))*(pca['mean'] - mean)
+		pca['ss'] += np.sum(shift**2)
+		pca['mean'] = pca['mean'] + b/(n + b)*(mean - pca['mean'])
+		m = np.vstack([pca['s'][:, None]*pca['v'], m, shift])
+	else:
+		pca['mean'] = mean
+	w, u = np.linalg.eigh(m @ m.T)
+	w, u = w[::-1][:keep], u[:, ::-1][:, :keep]
+	s = np.sqrt(np.maximum(w, 0.0))
+	v = (u.T @ m) / np.where(s > 0, s, 1.0)[:, None]
+	pca['n'], pca['s'], pca['v'] = n + b, s, v
+
+def main(argv):
+	try:
+		variables, files = getopt.getopt(argv, 'p:r:a:n:k:c:s:wo:')
+		opts = dict(variables)
+		if not files: files = sorted(glob.glob('./dpmdnm/mode-*/free-md/*.dcd'))
+		if not files: raise ValueError('no trajectory found')
+		atoms, ref, weights = crd.read(opts.get('-r', './modes/minimized-angstrom.crd'))
+		types = opts.get('-a', 'C,O,N,CA')
+		fitted = np.arange(len(atoms)) if types == 'all' else np.flatnonzero([a[2] in types.split(',') for a in atoms])
+		if len(fitted) < 3: raise ValueError('less than 3 atoms to fit')
+		psfatoms = psf.read(opts.get('-p', './inputs/step3.psf'))
+		sele = psf.index(psfatoms, atoms)
+		sqm = np.sqrt(psfatoms['mass'][sele])[:, None] if '-w' in opts else np.ones((len(atoms), 1))
+		npcs = int(opts.get('-n', 14))
+		keep = int(opts.get('-k', 2*npcs))
+		chunk, stride = int(opts.get('-c', 500)), int(opts.get('-s', 1))
+		if npcs < 1 or keep < npcs or chunk < 1 or stride < 1: raise ValueError('wrong number of PCs, chunk or stride')
+		trajs = [dcd.read(f) for f in files]
+		for f, t in zip(files, trajs):
+			if t['natoms'] != len(psfatoms['mass']):
+				raise ValueError(f+' has '+str(t['natoms'])+' atoms, the PSF file has '+str(len(psfatoms['mass'])))
+	except (getopt.GetoptError, ValueError, OSError) as e:
+		print('Input error:\n'+str(e))
+		sys.exit(2)
+
+	pca = {'n': 0, 'mean': None, 's': np.zeros(0), 'v': None, 'ss': 0.0}
+	for f, traj in zip(files, trajs):
+		nframes = 0
+		for start in range(0, traj['nframes'], chunk*stride):
+			xyz = dcd.coordinates(traj, start, start + chunk*stride, sele)[::stride]
+			update(pca, (sqm * rmsd.superpose(xyz, ref, fitted)).reshape(len(xyz), -1), keep)
+			nframes += len(xyz)
+		print('%s: %d frames' % (f, nframes))
+	if pca['n'] < 2:
+		print('Input error:\nless than 2 frames')
+		sys.exit(2)
+
+	npcs = min(npcs, len(pca['s']))
+	variance = pca['s'][:npcs]**2 / (pca['n'] - 1)
+	total = pca['ss'] / (pca['n'] - 1)
+	outdir = opts.get('-o', './modes/pca')
+	os.makedirs(os.path.join(outdir, 'crd'), exist_ok=True)
+	fmt = crd.template(atoms, weights)
+	for n in range(npcs):
+		v = pca['v'][n] * np.sign(pca['v'][n][np.argmax(np.abs(pca['v'][n]))]) # Largest component positive
+		crd.write(os.path.join(outdir, 'crd', 'mode-'+str(n + 1)+'.crd'), v.reshape(-1, 3), fmt=fmt,
+			title=['PRINCIPAL COMPONENT '+str(n + 1), 'VARIANCE %.6f' % variance[n]+(' (MASS-WEIGHTED)' if '-w' in opts else '')])
+	with open(os.path.join(outdir, 'pca-modes.txt'), 'w') as f:
+		f.write(''.join(str(n + 1)+'\n' for n in range(npcs)))
+	with open(os.path.join(outdir, 'pca.txt'), 'w') as f:
+		f.write('# %d frames of %d trajectories, total variance %.6f\n# PC variance fraction cumulative\n' % (pca['n'], len(files), total))
+		f.write(''.join('%d %.6f %.6f %.6f\n' % (n + 1, variance[n], variance[n]/total, variance[:n + 1].sum()/total) for n in range(npcs)))
+
+	print('\n'+str(pca['n'])+' frames, '+str(len(atoms))+' atoms\n')
+	print('PC   Variance     Fraction  Cumulative')
+	for n in range(npcs):
+		print('%-4d %-12.6f %-9.4f %-9.4f' % (n + 1, variance[n], variance[n]/total, variance[:n + 1].sum()/total))
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,46 @@
+import numpy as np
+
+"""
+Writing PDB files from a pre-rendered template
+
+Everything but the coordinates (atom names, residues, occupancy,
+B-factor, segment) is rendered once as a format string, so each
+file of the same structure is written with a single % operation
+
+The atoms of a template are read from a PDB file or built from
+the atoms of a CHARMM .crd file (see crd.py), as CHARMM writes
+them with "write coor pdb official"
+
+Usage (as a module):
+import pdbfile
+fmt = pdbfile.template(pdbfile.records('inputs/step6.pdb'), beta=1.0)
+pdbfile.write('out.pdb', xyz, fmt, title=['RESTRAINTS'])
+
+Antoniel A. S. Gomes
+"""
+
+def records(filename):
+	# ATOM and HETATM lines of a PDB file
+	with open(filename, 'r') as f:
+		return [line.rstrip('\n').ljust(66) for line in f if line.startswith(('ATOM  ', 'HETATM'))]
+
+def crdrecords(atoms):
+	# ATOM lines of the atoms of a .crd file (resno, resname, type, segid, resid), without coordinates
+	lines = []
+	for n, (resno, resname, type, segid, resid) in enumerate(atoms):
+		name = type if len(type) > 3 else ' '+type # Names of 4 characters start one column before
+		lines.append('ATOM  %5d %-4s %-4s%1s%4s    ' % ((n + 1) % 100000, name, resname, segid[:1], resid[-4:]) + ' '*36 + '      %-4s' % segid)
+	return lines
+
+def template(lines, occupancy=1.0, beta=0.0):
+	# occupancy and beta: a value or one value per atom
+	occupancy = np.broadcast_to(occupancy, len(lines))
+	beta = np.broadcast_to(beta, len(lines))
+	atoms = [l[:30].replace('%', '%%') + '%8.3f%8.3f%8.3f' + ('%6.2f%6.2f' % (o, b) + l[66:]).replace('%', '%%') + '\n'
+		for l, o, b in zip(lines, occupancy, beta)]
+	return ''.join(atoms) + 'END\n'
+
+def write(filename, xyz, fmt, title=()):
+	xyz = np.asarray(xyz, dtype=float)
+	with open(filename, 'w') as f:
+		f.write(''.join('REMARK %s\n' % t for t in title) + fmt % tuple(xyz.ravel()))
@@ -0,0 +1,86 @@
+import os
+import re
+import sys
+import getopt
+import numpy as np
+
+import crd
+import rmsd
+from dpmdnm_pdb import steps
+
+"""
+Removing near-duplicate dpSOL targets across combined vectors
+
+Different combined vectors may lead VMOD to almost the same
+structures (e.g. all of them start from the same one at 0 A),
+and each target costs a TMD, an equilibration and a free MD.
+The targets of all vectors are clustered by RMSD with a greedy
+leader algorithm (smallest displacements first): a target is kept
+if its RMSD to every kept target is above the cutoff (-t), otherwise
+it is pruned. All RMSD are computed in batches (see rmsd.py)
+
+The targets are the steps of ./vmod/mode-@REP/steps.txt (see
+adaptive_steps.py), or all VMOD structures. The kept steps are
+written back to ./vmod/mode-@REP/steps.txt, read by the stage
+scripts and scheduler.py, and the pruned ones to ./vmod/pruned.txt
+with the kept target that replaces them
+
+Usage: python scripts/prune_targets.py -t 0.5
+
+-t: RMSD cutoff (A). Default: 0.5
+-a: atom types used for RMSD, comma separated, or all. Default: C,O,N,CA
+-v: directory of the VMOD structures. Default: ./vmod
+--all: use all VMOD structures, ignoring the steps.txt files
+
+Antoniel A. S. Gomes
+"""
+
+def targets(vmod, every=False):
+	# (rep, dstep, file) of all targets, smallest displacements first
+	found = []
+	for rep in sorted([d[5:] for d in os.listdir(vmod) if re.match(r'mode-\d+$', d)], key=int):
+		chosen = None
+		if not every and os.path.exists(os.path.join(vmod, 'mode-'+rep, 'steps.txt')):
+			with open(os.path.join(vmod, 'mode-'+rep, 'steps.txt'), 'r') as f:
+				chosen = f.read().split()
+		for dstep, f in steps(os.path.join(vmod, 'mode-'+rep, 'conformation_{}.crd')):
+			if chosen is None or dstep in chosen: found.append((rep, dstep, f))
+	return sorted(found, key=lambda t: (float(t[1]), int(t[0])))
+
+def main(argv):
+	try:
+		opts = dict(getopt.getopt(argv, 't:a:v:', ['all'])[0])
+		cutoff = float(opts.get('-t', 0.5))
+		types = opts.get('-a', 'C,O,N,CA')
+		types = None if types == 'all' else types.split(',')
+		vmod = opts.get('-v', './vmod')
+		found = targets(vmod, '--all' in opts)
+		if not found: raise ValueError('no VMOD structure found in '+vmod)
+	except (getopt.GetoptError, ValueError, OSError) as e:
+		print('Input error:\n'+str(e))
+		sys.exit(2)
+
+	atoms, xyz, weights = crd.read(found[0][2])
+	sele = np.array([types is None or a[2] in types for a in atoms])
+	frames = np.array([crd.coordinates(f)[sele] for rep, dstep, f in found])
+	lead, assign = rmsd.leaders(frames, cutoff)
+	dist = rmsd.many(frames, frames[lead])
+
+	kept = {}
+	for i in lead:
+		kept.setdefault(found[i][0], []).append(found[i][1])
+	reps = sorted(set(t[0] for t in found), key=int)
+	for rep in reps:
+		with open(os.path.join(vmod, 'mode-'+rep, 'steps.txt'), 'w') as f:
+			f.write(''.join(dstep+'\n' for dstep in sorted(kept.get(rep, []), key=float)))
+		print('mode-%s: %d targets kept: %s' % (rep, len(kept.get(rep, [])), ' '.join(sorted(kept.get(rep, []), key=float))))
+	with open(os.path.join(vmod, 'pruned.txt'), 'w') as f:
+		f.write('# mode step kept_mode kept_step rmsd\n')
+		column = {l: n for n, l in enumerate(lead)}
+		for i, l in enumerate(assign):
+			if i != l:
+				f.write('%s %s %s %s %.4f\n' % (found[i][0], found[i][1], found[l][0], found[l][1], dist[i, column[l]]))
+	print('\n%d of %d targets kept, %d pruned (cutoff %g A)' % (len(lead), len(found), len(found) - len(lead), cutoff))
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,56 @@
+import numpy as np
+
+"""
+Reading the atoms of a PSF file (XPLOR or CHARMM format)
+
+The !NATOM section is read as a dictionary of arrays:
+segid, resid, resname, name, type, charge and mass,
+and the !NBOND section as (nbonds, 2) atom indices (from 0)
+
+Usage (as a module):
+import psf
+atoms = psf.read('inputs/step1.psf')
+masses = psf.masses(atoms, crdatoms) # Masses in the order of a .crd file
+prot = np.flatnonzero(atoms['segid'] == 'A') # Selection of a segment
+pairs = psf.bonds('inputs/step3.psf')
+
+Antoniel A. S. Gomes
+"""
+
+def read(filename):
+	with open(filename, 'r') as f:
+		for line in f:
+			if '!NATOM' in line:
+				natoms = int(line.split()[0])
+				break
+		else:
+			raise ValueError(filename+' has no !NATOM section')
+		l = [next(f).split() for n in range(natoms)]
+	return {'segid': np.array([a[1] for a in l]), 'resid': np.array([a[2] for a in l]),
+		'resname': np.array([a[3] for a in l]), 'name': np.array([a[4] for a in l]),
+		'type': np.array([a[5] for a in l]), 'charge': np.array([a[6] for a in l], dtype=float),
+		'mass': np.array([a[7] for a in l], dtype=float)}
+
+def index(atoms, crdatoms):
+	# Indices of the atoms of a .crd file, (resno, resname, type, segid, resid), see crd.py
+	index = {key: i for i, key in enumerate(zip(atoms['segid'], atoms['resid'], atoms['name']))}
+	try:
+		return np.array([index[(a[3], a[4], a[2])] for a in crdatoms], dtype=int)
+	except KeyError as e:
+		raise ValueError('Atom '+' '.join(e.args[0])+' is not in the PSF file')
+
+def masses(atoms, crdatoms):
+	return atoms['mass'][index(atoms, crdatoms)]
+
+def bonds(filename):
+	with open(filename, 'r') as f:
+		for line in f:
+			if '!NBOND' in line:
+				nbonds = int(line.split()[0])
+				break
+		else:
+			raise ValueError(filename+' has no !NBOND section')
+		values = []
+		while len(values) < 2*nbonds:
+			values += next(f).split()
+	return np.array(values, dtype=int).reshape(nbonds, 2) - 1
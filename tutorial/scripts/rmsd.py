@@ -0,0 +1,109 @@
+import numpy as np
+
+"""
+RMSD of structures after optimal superposition (Kabsch)
+
+Structures are stacked as (M, natoms, 3) arrays, and every
+superposition of a batch is done at once from the 3x3 correlation
+matrices of the pairs (SVD, or QCP for many pairs), without rotating
+the coordinates unless they are needed (superpose)
+
+Usage (as a module):
+import rmsd
+d = rmsd.kabsch(frames, reference)   # (M,) RMSD of each frame
+D = rmsd.matrix(frames)              # (M, M) RMSD of all pairs
+fit = rmsd.superpose(frames, reference) # frames fitted on the reference
+fit = rmsd.superpose(frames, reference, sele) # fitted on the selected atoms
+D = rmsd.many(frames, references)    # (M, K) RMSD of frames against references
+lead, assign = rmsd.leaders(frames, 0.5) # Leader clustering
+
+Antoniel A. S. Gomes
+"""
+
+def center(x):
+	x = np.asarray(x, dtype=float)
+	return x - x.mean(axis=-2, keepdims=True)
+
+def kabsch(x, y, centered=False):
+	# RMSD between x and y, (..., natoms, 3), broadcast over the leading dimensions
+	if not centered: x, y = center(x), center(y)
+	h = np.einsum('...ni,...nj->...ij', x, y) # Correlation matrices
+	s = np.linalg.svd(h, compute_uv=False)
+	d = np.sign(np.linalg.det(h)) # Reflection: the smallest singular value changes sign
+	s[..., 2] *= np.where(d == 0, 1.0, d)
+	e = np.sum(x*x, axis=(-2, -1)) + np.sum(y*y, axis=(-2, -1)) - 2.0*s.sum(axis=-1)
+	return np.sqrt(np.maximum(e, 0.0) / x.shape[-2])
+
+def superpose(x, y, sele=None):
+	# x (..., natoms, 3) rotated and translated onto y (natoms, 3)
+	# With sele, only the selected atoms are fitted, and all atoms are moved
+	x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+	if sele is None: sele = slice(None)
+	xm, ym = x[..., sele, :].mean(axis=-2, keepdims=True), y[sele].mean(axis=0)
+	u, s, vt = np.linalg.svd(np.einsum('...ni,nj->...ij', x[..., sele, :] - xm, y[sele] - ym))
+	d = np.sign(np.linalg.det(u @ vt))
+	u[..., :, 2] *= d[..., None] # No reflection
+	return (x - xm) @ (u @ vt) + ym
+
+def qcp(h, g, tol=1e-11):
+	# Sum of the signed singular values of the correlation matrices h (..., 3, 3):
+	# the largest eigenvalue of their 4x4 quaternion matrices (QCP), found by
+	# Newton iterations on the characteristic polynomial from its upper bound g
+	sxx, sxy, sxz = h[..., 0, 0], h[..., 0, 1], h[..., 0, 2]
+	syx, syy, syz = h[..., 1, 0], h[..., 1, 1], h[..., 1, 2]
+	szx, szy, szz = h[..., 2, 0], h[..., 2, 1], h[..., 2, 2]
+	k = np.array([[sxx + syy + szz, syz - szy, szx - sxz, sxy - syx],
+		[syz - szy, sxx - syy - szz, sxy + syx, szx + sxz],
+		[szx - sxz, sxy + syx, -sxx + syy - szz, syz + szy],
+		[sxy - syx, szx + sxz, syz + szy, -sxx - syy + szz]])
+	c2 = -2.0*np.sum(h*h, axis=(-2, -1))
+	c1 = -8.0*np.linalg.det(h)
+	c0 = np.linalg.det(np.moveaxis(k, (0, 1), (-2, -1)))
+	l = np.array(g, dtype=float)
+	for n in range(50):
+		l2 = l*l
+		dl = ((l2 + c2)*l2 + c1*l + c0) / np.where((4.0*l2 + 2.0*c2)*l + c1 == 0, 1.0, (4.0*l2 + 2.0*c2)*l + c1)
+		l = l - dl
+		if np.all(np.abs(dl) <= tol*np.abs(l)): break
+	return l
+
+def many(frames, refs, block=4096):
+	# (M, K) RMSD of M frames against K references, by blocks of frames
+	# Only the 3x3 correlation matrices of the pairs are built
+	frames, refs = center(frames), center(refs)
+	nf, nr = np.sum(frames**2, axis=(1, 2)), np.sum(refs**2, axis=(1, 2))
+	d = np.zeros((len(frames), len(refs)))
+	for b0 in range(0, len(frames), block):
+		h = np.einsum('mni,knj->mkij', frames[b0:b0 + block], refs, optimize=True)
+		g = 0.5*(nf[b0:b0 + block, None] + nr[None, :])
+		e = 2.0*(g - qcp(h, g))
+		d[b0:b0 + block] = np.sqrt(np.maximum(e, 0.0) / frames.shape[1])
+	return d
+
+def leaders(frames, cutoff, block=256):
+	# Greedy leader clustering: a frame is a new leader if its RMSD to all leaders
+	# is above cutoff, otherwise it joins the closest one
+	# Returns the leaders (indices) and the leader of each frame
+	frames = center(frames)
+	lead, assign = [], np.zeros(len(frames), dtype=int)
+	for b0 in range(0, len(frames), block):
+		b = frames[b0:b0 + block]
+		old = many(b, frames[lead]) if lead else np.zeros((len(b), 0)) # Leaders of previous blocks, at once
+		new = [] # Leaders found in this block
+		for i in range(len(b)):
+			dist = np.concatenate([old[i], many(b[i:i + 1], b[new])[0]]) if new else old[i]
+			if len(dist) == 0 or dist.min() > cutoff:
+				new.append(i)
+				assign[b0 + i] = b0 + i
+			else:
+				j = int(np.argmin(dist))
+				assign[b0 + i] = lead[j] if j < len(lead) else b0 + new[j - len(lead)]
+		lead += [b0 + i for i in new]
+	return np.array(lead, dtype=int), assign
+
+def matrix(frames):
+	# Symmetric (M, M) matrix of the RMSD of all pairs of frames
+	d = many(frames, frames)
+	d = 0.5*(d + d.T)
+	np.fill_diagonal(d, 0.0)
+	return d
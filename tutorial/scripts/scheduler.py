@@ -0,0 +1,227 @@
+import os
+import sys
+import time
+import getopt
+import shutil
+import filecmp
+import subprocess
+import multiprocessing
+
+"""
+Running the jobs of the dpMDNM and MDeNM stages on all cores of a node
+
+The jobs of a stage (one per combined vector and displacement step,
+or per replica and excitation) are independent, except successive
+excitations of a replica. Instead of running them one after another,
+as the stage scripts do, they are started as soon as enough cores are
+free (-c cores per job, -n cores in total) and their inputs are ready.
+A job is skipped if its outputs already exist, and jobs depending on
+a failed job are not started. Several stages can be given: a job then
+also waits for the same job of the previous stage
+
+Stages (run from the tutorial directory):
+vmod:          VMOD structures of each combined vector (CHARMM)
+tmd:           TMD of each combined vector and step (NAMD), the steps
+               of ./vmod/mode-@REP/steps.txt if any (see adaptive_steps.py).
+               With vmod, the steps are read once vmod has finished, and
+               the TMD of a vector waits for its VMOD structures
+equil:         equilibration with positional restraints (NAMD)
+free-md:       free MD of dpMDNM (NAMD)
+mdenm-exc:     successive excitations of each MDeNM replica (NAMD)
+mdenm-free-md: free MD of each MDeNM excitation (NAMD)
+
+The input files of each stage (step3.str, col.col, NAMD parameters,
+restraint pdbs, ...) must be generated first, as in the stage scripts
+
+Usage: python scripts/scheduler.py -c 2 tmd
+       python scripts/scheduler.py -c 4 -n 32 equil free-md
+
+-c: cores per job (NAMD +p). Default: 2
+-n: cores used in total. Default: number of CPUs
+-x: number of excitations of MDeNM. Default: 10
+--namd: NAMD executable. Default: /usr/local/namd2/namd2
+--charmm: CHARMM executable. Default: /usr/local/charmm/c41b1/charmm
+--force: run jobs even if their outputs exist
+--dry-run: only print the jobs
+
+Any executable can be used as engine (e.g. a stub writing the expected
+outputs), it is run as: engine +p<cores> input.inp, in the directory of
+the job, with the environment variables rep and dstep (or exc)
+
+Antoniel A. S. Gomes
+"""
+
+STAGES = ('vmod', 'tmd', 'equil', 'free-md', 'mdenm-exc', 'mdenm-free-md')
+DSTEPS = ['%g' % (0.1*i) for i in range(31)] # Displacement steps: 0 0.1 ... 3
+
+def dsteps(rep, vmod='./vmod'):
+	# Steps chosen by adaptive_steps.py, or all steps
+	# A list older than the VMOD structures was chosen among other structures
+	filename = os.path.join(vmod, 'mode-'+rep, 'steps.txt')
+	if not os.path.exists(filename): return DSTEPS
+	structure = os.path.join(vmod, 'mode-'+rep, 'conformation_3.crd')
+	if os.path.exists(structure) and os.path.getmtime(filename) < os.path.getmtime(structure):
+		raise ValueError(filename+' is older than the VMOD structures, run adaptive_steps.py again or remove it')
+	with open(filename, 'r') as f:
+		return f.read().split()
+
+def nreps(listmodes='./inputs/list-modes.txt'):
+	# Number of combined vectors, one per row of weights
+	with open(listmodes, 'r') as f:
+		return sum(1 for line in f if line.strip())
+
+def job(stage, key, cwd, cmd, env, log, outputs, copy=None, after=()):
+	return {'stage': stage, 'key': key, 'name': stage+' '+' '.join(key), 'cwd': cwd, 'cmd': cmd, 'env': env,
+		'log': log, 'outputs': outputs, 'copy': copy, 'after': list(after), 'cores': 1}
+
+def jobs(stage, reps, opts):
+	# Jobs of a stage, with the cores and executables of the options
+	namd, charmm, cores = opts['namd'], opts['charmm'], opts['cores']
+	found = []
+	for rep in [str(r) for r in range(1, reps + 1)]:
+		if stage == 'vmod':
+			found.append(job(stage, (rep,), '.', [charmm, '-i', 'scripts/vmod.inp', 'modnu='+rep, '-o', 'vmod/mode-'+rep+'/vmod-'+rep+'.out'],
+				{'rep': rep}, None, ['vmod/mode-'+rep+'/conformation_3.crd']))
+			found[-1]['mkdir'] = 'vmod/mode-'+rep
+		elif stage in ('tmd', 'equil', 'free-md'):
+			cwd = os.path.join('dpmdnm', 'mode-'+rep, stage)
+			for dstep in dsteps(rep):
+				name = stage+'_'+rep+'_'+dstep
+				found.append(job(stage, (rep, dstep), cwd, [namd, '+p'+str(cores), 'dpmdnm-'+stage+'.inp'], {'rep': rep, 'dstep': dstep},
+					name+'.out', [name+'.coor'], os.path.join('scripts', 'dpmdnm-'+stage+'.inp')))
+		elif stage == 'mdenm-exc':
+			cwd = os.path.join('mdenm', 'excitations', rep)
+			for exc in [str(e) for e in range(1, opts['nexc'] + 1)]:
+				name = 'rep-'+rep+'-e'+exc
+				after = [(stage, (rep, str(int(exc) - 1)))] if exc != '1' else []
+				found.append(job(stage, (rep, exc), cwd, [namd, '+p'+str(cores), 'namd-exc.inp'], {'rep': rep, 'exc': exc},
+					name+'.out', [name+'.coor'], os.path.join('mdenm', 'namd', 'namd-exc.inp'), after))
+		elif stage == 'mdenm-free-md':
+			cwd = os.path.join('mdenm', 'excitations', rep, 'free-md')
+			for exc in [str(e) for e in range(1, opts['nexc'] + 1)]:
+				name = 'md-rep-'+rep+'-e'+exc
+				found.append(job(stage, (rep, exc), cwd, [namd, '+p'+str(cores), 'namd-free-md.inp'], {'rep': rep, 'exc': exc},
+					name+'.out', [name+'.coor'], os.path.join('mdenm', 'namd', 'namd-free-md.inp')))
+	for j in found:
+		if stage != 'vmod': j['cores'] = cores
+	return found
+
+def prepare(joblist):
+	# Copy the stage inputs once per directory, before any job reads them
+	# A copy identical to the input is kept, otherwise it is replaced at once
+	for source, cwd in sorted(set((j['copy'], j['cwd']) for j in joblist if j['copy'])):
+		os.makedirs(cwd, exist_ok=True)
+		target = os.path.join(cwd, os.path.basename(source))
+		if os.path.exists(target) and filecmp.cmp(source, target, shallow=False): continue
+		shutil.copy(source, target+'.tmp')
+		os.replace(target+'.tmp', target)
+
+def start(j):
+	os.makedirs(j.get('mkdir', j['cwd']), exist_ok=True)
+	env = dict(os.environ, **j['env'])
+	log = open(os.path.join(j['cwd'], j['log']), 'w') if j['log'] else subprocess.DEVNULL
+	try:
+		return subprocess.Popen(j['cmd'], cwd=j['cwd'], env=env, stdout=log, stderr=subprocess.STDOUT)
+	finally:
+		if j['log']: log.close()
+
+def run(joblist, ncores, force=False, dry=False, previous={}):
+	# Run the jobs packing them on ncores. Returns the status of each job:
+	# done, skipped (outputs found), failed (exit code) or blocked (a job it depends on failed)
+	# previous: status of the jobs already run, by (stage, key)
+	status = {}
+	index = {(j['stage'], j['key']): j for j in joblist}
+	for j in joblist:
+		j['after'] = [a for a in j['after'] if a in index or a in previous]
+		if not force and all(os.path.exists(os.path.join(j['cwd'], o)) for o in j['outputs']):
+			status[j['name']] = 'skipped'
+	if dry:
+		for j in joblist:
+			print('%-28s %-8s %s$ %s' % (j['name'], status.get(j['name'], 'pending'), j['cwd'], ' '.join(j['cmd'])))
+		return status
+	pending = [j for j in joblist if j['name'] not in status]
+	running = []
+	free = ncores
+	while pending or running:
+		for j in list(pending):
+			after = [status.get(index[a]['name']) if a in index else previous[a] for a in j['after']]
+			if any(s in ('failed', 'blocked') for s in after):
+				status[j['name']] = 'blocked'
+				pending.remove(j)
+				print(j['name']+' blocked')
+			elif all(s in ('done', 'skipped') for s in after) and min(j['cores'], ncores) <= free:
+				try:
+					running.append((j, start(j), time.time()))
+				except OSError as e:
+					status[j['name']] = 'failed'
+					print(j['name']+' failed: '+str(e))
+				else:
+					free -= min(j['cores'], ncores)
+					print(j['name']+' started')
+				pending.remove(j)
+		time.sleep(0.2)
+		for r in list(running):
+			j, p, t = r
+			if p.poll() is None: continue
+			running.remove(r)
+			free += min(j['cores'], ncores)
+			missing = [o for o in j['outputs'] if not os.path.exists(os.path.join(j['cwd'], o))]
+			if p.returncode == 0 and not missing:
+				status[j['name']] = 'done'
+				print('%s done (%.1f s)' % (j['name'], time.time() - t))
+			else:
+				status[j['name']] = 'failed'
+				print('%s failed (exit code %d%s)' % (j['name'], p.returncode, ', missing '+' '.join(missing) if missing else ''))
+	return status
+
+def main(argv):
+	longopts = ['namd=', 'charmm=', 'force', 'dry-run']
+	try:
+		variables, stages = getopt.gnu_getopt(argv, 'c:n:x:', longopts)
+		opts = dict(variables)
+		config = {'cores': int(opts.get('-c', 2)), 'nexc': int(opts.get('-x', 10)),
+			'namd': opts.get('--namd', '/usr/local/namd2/namd2'), 'charmm': opts.get('--charmm', '/usr/local/charmm/c41b1/charmm')}
+		ncores = int(opts.get('-n', multiprocessing.cpu_count()))
+		for engine in ('namd', 'charmm'):
+			# Jobs run in their own directories
+			if os.sep in config[engine]: config[engine] = os.path.abspath(config[engine])
+		if not stages: raise ValueError('no stage given, choose among: '+' '.join(STAGES))
+		for stage in stages:
+			if stage not in STAGES: raise ValueError('unrecognized stage '+stage+', choose among: '+' '.join(STAGES))
+		if config['cores'] < 1 or ncores < 1: raise ValueError('the number of cores must be positive')
+		reps = nreps()
+	except (getopt.GetoptError, ValueError, OSError) as e:
+		print('Input error:\n'+str(e))
+		sys.exit(2)
+
+	# The steps of the dpSOL stages are those of the VMOD structures: the stages
+	# after vmod are run once it has finished
+	phases = [stages]
+	if 'vmod' in stages[:-1]:
+		n = stages.index('vmod') + 1
+		phases = [stages[:n], stages[n:]]
+	previous, status, total = {}, {}, 0
+	for phase in phases:
+		joblist = []
+		try:
+			for stage in phase:
+				for j in jobs(stage, reps, config):
+					# A job waits for the same job (or replica, after vmod) of the previous stage
+					n = stages.index(stage)
+					if n > 0: j['after'].append((stages[n - 1], j['key'][:1] if stages[n - 1] == 'vmod' else j['key']))
+					joblist.append(j)
+			if '--dry-run' not in opts: prepare(joblist)
+		except (ValueError, OSError) as e:
+			print('Input error:\n'+str(e))
+			sys.exit(2)
+		result = run(joblist, ncores, '--force' in opts, '--dry-run' in opts, previous)
+		previous.update({(j['stage'], j['key']): result.get(j['name'], 'pending') for j in joblist})
+		status.update(result)
+		total += len(joblist)
+	if '--dry-run' in opts: return
+	counts = {s: list(status.values()).count(s) for s in ('done', 'skipped', 'failed', 'blocked')}
+	print('\n'+str(total)+' jobs: '+', '.join(str(c)+' '+s for s, c in counts.items()))
+	if counts['failed'] or counts['blocked']: sys.exit(1)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])